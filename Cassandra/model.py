@@ -1,12 +1,8 @@
-import random
 import uuid
 
 import time_uuid
-from cassandra.query import BatchStatement
 from datetime import datetime, timedelta
-from DGraph import modeldgraph
-import requests
-from bson import ObjectId  # Manage objectID 
+import loadjob
 
 
 CREATE_KEYSPACE = """
@@ -193,193 +189,10 @@ def create_schema(session):
     session.execute(CREATE_ESCALATION_BY_TICKET_TABLE)
     session.execute(CREATE_TICKET_COUNT_BY_CHANNEL_DATE_TABLE)
 
-def bulk_insert(session, dgraph_client, mongo_client):
-    base_url = "http://localhost:8003" 
-    def convert_objectid(data):
-        if isinstance(data, list):
-            return [convert_objectid(item) for item in data]
-        elif isinstance(data, dict):
-            return {k: convert_objectid(v) for k, v in data.items()}
-        elif isinstance(data, ObjectId):
-            return str(data)
-        else:
-            return data
-
-    # Prepare the insert statements for Cassandra
-    ticket_by_date_stmt = session.prepare("INSERT INTO ticket_by_date (created_date, created_timestamp, ticket_id, customer_id, description, status) VALUES (?, ?, ?, ?, ?, ?)")
-    activity_by_ticket_stmt = session.prepare("INSERT INTO activity_by_ticket (ticket_id, activity_timestamp, activity_type, status, agent_id) VALUES (?, ?, ?, ?, ?)")
-    tickets_by_agent_date_stmt = session.prepare("INSERT INTO tickets_by_agent_date (agent_id, assigned_date, ticket_id, priority, status) VALUES (?, ?, ?, ?, ?)")
-    feedback_by_agent_stmt = session.prepare("INSERT INTO feedback_by_agent (agent_id, ticket_id, feedback_rating, feedback_comments) VALUES (?, ?, ?, ?)")
-    urgent_tickets_by_time_stmt = session.prepare("INSERT INTO urgent_tickets_by_time (priority, created_timestamp, ticket_id, customer_id, description, agent_id) VALUES (?, ?, ?, ?, ?, ?)")
-    tickets_by_customer_stmt = session.prepare("INSERT INTO tickets_by_customer (customer_id, ticket_id, created_timestamp, status, priority) VALUES (?, ?, ?, ?, ?)")
-    escalation_by_ticket_stmt = session.prepare("INSERT INTO escalation_by_ticket (ticket_id, escalation_timestamp, escalation_level, agent_id, comments) VALUES (?, ?, ?, ?, ?)")
-    ticket_count_by_channel_date_stmt = session.prepare("INSERT INTO ticket_count_by_channel_date (created_date, support_channel, ticket_count, ticket_id) VALUES (?, ?, ?, ?)")
-
-    # MongoDB Collections
-    db = mongo_client["final_project"] 
-    tickets_collection = db["tickets"]
-    users_collection = db["users"]
-    agent_assignments_collection = db["agent_assignments"]
-    daily_reports_collection = db["daily_reports"]
-
-
-    # Indexes Creation
-    db.users.create_index("uuid", unique=True, name="user_id_unique_index")  
-    db.users.create_index("email", unique=True, name="email_unique_index")  
-
-    db.tickets.create_index("uuid", unique=True, name="ticket_id_unique_index")  
-    db.tickets.create_index("status", name="status_index")  
-    db.tickets.create_index("priority", name="priority_index")  
-    db.tickets.create_index("category", name="category_index")  
-
-    db.agent_assignments.create_index("agent_id", name="agent_id_index")  
-    db.agent_assignments.create_index("priority_level", name="priority_level_index") 
-
-    db.daily_reports.create_index("report_date", name="report_date_index")  
-
-    print("Indexes created successfully!")
-
-    
-    # Data generation
-    ticket_ids = [i for i in range(1, 11)]
-    agent_ids = [i for i in range(1, 3)]
-    customer_ids = [i for i in range(1, 3)]
-    support_channels = ['phone', 'email', 'chat']
-    statuses = ['open', 'resolved', 'in_progress']
-    priorities = ['high', 'medium', 'low']
-    feedback_ratings = [1, 2, 3, 4, 5]
-    escalation_levels = ['level_1', 'level_2', 'level_3']
-
-    batch = BatchStatement()
-
-    # Create agents and customers in the Users collection
-    users_data = [
-        {"uuid": f"{agent_id}_", "username": f"agent_{i+1}", "email": f"agent{agent_id}@example.com","role": "agent", "profile": {"name": f"Agent {i+1}"}} for i, agent_id in enumerate(agent_ids)
-    ] + [
-        {"uuid": f"{customer_id}", "username": f"customer_{i+1}", "email": f"customer{customer_id}@example.com","role": "customer", "profile": {"name": f"Customer {i+1}"}} for i, customer_id in enumerate(customer_ids)
-    ]
-    #users_collection.insert_many(users_data)
-    
-    users_data_serializable = convert_objectid(users_data)
-    requests.post(f"{base_url}/users/", json=users_data_serializable)
-
-    ticket_data = []
-    for i, ticket_id in enumerate(ticket_ids):
-        customer_id = random.choice(customer_ids)
-        agent_id = random.choice(agent_ids)
-        created_date = datetime.now().date()
-        created_timestamp = datetime.now() + timedelta(seconds=i) #all are unique
-        escalation_timestamp = datetime.now() + timedelta(seconds=i)
-        description = f"Ticket {i+1} description"
-        status = random.choice(statuses)
-        priority = random.choice(priorities)
-        feedback_rating = random.choice(feedback_ratings)
-        escalation_level = random.choice(escalation_levels)
-        support_channel = random.choice(support_channels)
-
-        # Insert into Cassandra
-        batch.add(ticket_by_date_stmt, (created_date, created_timestamp, ticket_id, customer_id, description, status))
-        batch.add(tickets_by_agent_date_stmt, (agent_id, created_date, ticket_id, priority, status))
-        batch.add(tickets_by_customer_stmt, (customer_id, ticket_id, created_timestamp, status, priority))
-        batch.add(activity_by_ticket_stmt, (ticket_id, created_timestamp, "created", status, agent_id))
-        batch.add(feedback_by_agent_stmt, (agent_id, ticket_id, feedback_rating, "Comments", ))
-        batch.add(urgent_tickets_by_time_stmt, (priority, created_timestamp, ticket_id, customer_id, "description", agent_id))
-        batch.add(escalation_by_ticket_stmt, (ticket_id, escalation_timestamp, escalation_level, agent_id, "Comments"))
-        batch.add(ticket_count_by_channel_date_stmt, (created_timestamp, support_channel, i, ticket_id))
-
-        # Collect data for Dgraph
-        ticket_data.append({
-            'uid': f'_:ticket{i+1}',
-            'dgraph.type': 'Ticket',
-            'ticket_id': ticket_id,
-            'status': status,
-            'priority': priority,
-            'created_at': created_timestamp.isoformat(),
-            'assigned_to': {'uid': f'_:agent{agent_ids.index(agent_id)+1}'},
-            'created_by': {'uid': f'_:customer{customer_ids.index(customer_id)+1}'},
-            'messages': [{'uid': f'_:message{i}', 'dgraph.type': 'Message', 'sender': { 'uid' : f'_:customer{customer_ids.index(customer_id)+1}'}, 'message_text': 'text', 'belongs_to': {'uid': f'_:ticket{i+1}'}},]
-        })
-
-        #Data to mongoDB
-        # Mongo: Insert into Tickets Collection
-        ticket_document = {
-            "uuid": ticket_id,
-            "customer_id": customer_id,
-            "description": f"Ticket {i+1} issue description",
-            "status": status,
-            "priority": priority,
-            "created_timestamp": created_timestamp.isoformat(),
-            "updated_timestamp": created_timestamp.isoformat(),
-            "category": "technical",
-            "messages": [],
-            "feedback": {
-                "rating": feedback_rating
-            },
-            "resolution_steps": [],
-            "channel": support_channel
-        }
-
-        ticket_document_serializable = [{
-            'uuid': str(ticket_document['uuid']),  # Convert uuid to string
-            'customer_id': str(ticket_document['customer_id']),  # Convert customer_id to string
-            'description': ticket_document['description'],
-            'status': ticket_document['status'],
-            'priority': ticket_document['priority'],
-            'created_timestamp': ticket_document['created_timestamp'],
-            'updated_timestamp': ticket_document['updated_timestamp'],
-            'category': ticket_document['category'],
-            'messages': ticket_document['messages'],
-            'feedback': ticket_document['feedback'],
-            'resolution_steps': ticket_document['resolution_steps'],
-            'channel': ticket_document['channel'],
-        }]
-        requests.post(f"{base_url}/tickets/", json=ticket_document_serializable)
-
-
-        # Mongo: Insert into AgentAssignments Collection
-        assignment_document = {
-            "uuid": str(uuid.uuid4()),
-            "agent_id": agent_id,
-            "ticket_id": ticket_id,
-            "assigned_timestamp": created_timestamp.isoformat(),
-            "priority_level": ticket_document["priority"]
-        }
-        
-        assignment_document_serializable = [{
-            'uuid': str(assignment_document['uuid']),  # Convert uuid to string
-            'agent_id': str(assignment_document['agent_id']),  # Convert customer_id to string
-            'ticket_id': str(assignment_document['ticket_id']),
-            'assigned_timestamp': assignment_document['assigned_timestamp'],
-            'priority_level': assignment_document['priority_level'],
-        }]    
-        response = requests.post(f"{base_url}/AgentAssignments/", json=assignment_document_serializable)
-        if response.status_code == 422:
-            print(response.json())  
-
-    # Generate and insert daily report
-    daily_report = {
-        "uuid": str(uuid.uuid4()),
-        "report_date": datetime.now().date().isoformat(),
-        "ticket_count": len(ticket_ids),
-        "channel_stats": {
-            channel: sum(1 for t in tickets_collection.find({"channel": channel})) for channel in support_channels
-        }
-    }
-    
-
-    daily_report_serializable = [convert_objectid(daily_report)]
-    response = requests.post(f"{base_url}/dailyReports/", json=daily_report_serializable)
-    if response.status_code == 422:
-        print(response.json())  
-    
-    
-    # Execute the batch
-    session.execute(batch)
-    
-    # Insert data into Dgraph
-    modeldgraph.create_data(dgraph_client, ticket_data, agent_ids, customer_ids)
-
-    print("Bulk insert complete!")
+def bulk_insert(session, dgraph_client, mongo_client, ticket_count=10, agent_count=2, customer_count=2, days=1, seed=None):
+    # Checkpointed load: rerunning after a failure resumes from the last finished chunk
+    loadjob.run(session, dgraph_client, mongo_client, ticket_count=ticket_count, agent_count=agent_count,
+                customer_count=customer_count, days=days, seed=seed)
     
 #User the Tickets by Customer table, for usage on admin and customer
 def get_user_tickets(session, customer_id):
@@ -0,0 +1,195 @@
+from collections import defaultdict
+from datetime import datetime
+
+from cassandra.concurrent import execute_concurrent
+from cassandra.query import BatchStatement, BatchType, UNSET_VALUE
+
+import datagen
+
+DEFAULT_CONCURRENCY = 64       # max requests in flight
+DEFAULT_MAX_BATCH_ROWS = 20    # rows per unlogged single-partition batch
+
+# Insert statement per table and how many leading values form its partition key
+INSERT_STATEMENTS = {
+    "ticket_by_date": ("INSERT INTO ticket_by_date (created_date, created_timestamp, ticket_id, customer_id, description, status) VALUES (?, ?, ?, ?, ?, ?)", 1),
+    "tickets_by_agent_date": ("INSERT INTO tickets_by_agent_date (agent_id, assigned_date, ticket_id, priority, status) VALUES (?, ?, ?, ?, ?)", 1),
+    "tickets_by_customer": ("INSERT INTO tickets_by_customer (customer_id, ticket_id, created_timestamp, status, priority) VALUES (?, ?, ?, ?, ?)", 1),
+    "activity_by_ticket": ("INSERT INTO activity_by_ticket (ticket_id, activity_timestamp, activity_type, status, agent_id) VALUES (?, ?, ?, ?, ?)", 1),
+    "feedback_by_agent": ("INSERT INTO feedback_by_agent (agent_id, ticket_id, feedback_rating, feedback_comments) VALUES (?, ?, ?, ?)", 1),
+    "urgent_tickets_by_time": ("INSERT INTO urgent_tickets_by_time (priority, created_timestamp, ticket_id, customer_id, description, agent_id) VALUES (?, ?, ?, ?, ?, ?)", 1),
+    "escalation_by_ticket": ("INSERT INTO escalation_by_ticket (ticket_id, escalation_timestamp, escalation_level, agent_id, comments) VALUES (?, ?, ?, ?, ?)", 1),
+    "ticket_count_by_channel_date": ("INSERT INTO ticket_count_by_channel_date (created_date, support_channel, ticket_count, ticket_id) VALUES (?, ?, ?, ?)", 1),
+}
+
+
+def prepare_inserts(session):
+    return {table: session.prepare(cql) for table, (cql, _) in INSERT_STATEMENTS.items()}
+
+
+# ROWS OF EVERY DENORMALIZED TABLE FOR ONE GENERATED TICKET
+def ticket_rows(ticket):
+    ticket_id = ticket["ticket_id"]
+    customer_id = ticket["customer_id"]
+    agent_id = ticket["agent_id"]
+    created_date = ticket["created_date"]
+    created_timestamp = ticket["created_timestamp"]
+    status = ticket["status"]
+    priority = ticket["priority"]
+
+    yield "ticket_by_date", (created_date, created_timestamp, ticket_id, customer_id, ticket["description"], status)
+    yield "tickets_by_agent_date", (agent_id, created_date, ticket_id, priority, status)
+    yield "tickets_by_customer", (customer_id, ticket_id, created_timestamp, status, priority)
+    yield "activity_by_ticket", (ticket_id, created_timestamp, "created", status, agent_id)
+    yield "feedback_by_agent", (agent_id, ticket_id, ticket["feedback_rating"], "Comments")
+    yield "urgent_tickets_by_time", (priority, created_timestamp, ticket_id, customer_id, "description", agent_id)
+    yield "escalation_by_ticket", (ticket_id, ticket["escalation_timestamp"], ticket["escalation_level"], agent_id, "Comments")
+    yield "ticket_count_by_channel_date", (created_date, ticket["support_channel"], ticket["seq"], ticket_id)
+
+
+def imported_ticket_rows(ticket):
+    # Imported tickets have no agent, so only the customer/date tables can be filled
+    created_timestamp = as_datetime(ticket["created_timestamp"])
+    ticket_id = int(ticket["uuid"])
+    customer_id = int(ticket["customer_id"])
+
+    yield "ticket_by_date", (created_timestamp.date(), created_timestamp, ticket_id, customer_id, ticket["description"], ticket["status"])
+    yield "tickets_by_customer", (customer_id, ticket_id, created_timestamp, ticket["status"], ticket["priority"])
+    yield "ticket_count_by_channel_date", (created_timestamp.date(), ticket["channel"], 1, ticket_id)
+
+
+def imported_assignment_rows(assignment):
+    # The ticket status is not part of an assignment: UNSET leaves whatever is stored untouched
+    assigned_timestamp = as_datetime(assignment["assigned_timestamp"])
+    yield "tickets_by_agent_date", (int(assignment["agent_id"].rstrip("_")), assigned_timestamp.date(), int(assignment["ticket_id"]), assignment["priority_level"], UNSET_VALUE)
+
+
+# ROWS REWRITTEN WHEN A TICKET CHANGES STATUS OR PRIORITY
+DELETE_URGENT_TICKET = "DELETE FROM urgent_tickets_by_time WHERE priority = ? AND agent_id = ? AND ticket_id = ? AND created_timestamp = ?"
+
+
+def as_datetime(value):
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+def ticket_update_rows(ticket, previous_priority):
+    """
+    Rows to write (and urgent_tickets_by_time keys to delete) so the Cassandra
+    tables match an updated Mongo ticket. Keys come from the Mongo document;
+    inserts are upserts, so rewriting the full row only changes status/priority.
+    Yields ("insert", table, params) and ("delete", table, params).
+    """
+    created_timestamp = as_datetime(ticket["created_timestamp"])
+    ticket_id = int(ticket["uuid"])
+    customer_id = int(ticket["customer_id"])
+    status = ticket["status"]
+    priority = ticket["priority"]
+
+    yield "insert", "ticket_by_date", (created_timestamp.date(), created_timestamp, ticket_id, customer_id, ticket["description"], status)
+    yield "insert", "tickets_by_customer", (customer_id, ticket_id, created_timestamp, status, priority)
+
+    # Imported tickets without an assignment have no rows in the agent tables
+    if ticket.get("agent_id") is None:
+        return
+    agent_id = int(ticket["agent_id"].rstrip("_"))
+    assigned_date = as_datetime(ticket["assigned_timestamp"]).date()
+    yield "insert", "tickets_by_agent_date", (agent_id, assigned_date, ticket_id, priority, status)
+    yield "insert", "activity_by_ticket", (ticket_id, datetime.now(), "updated", status, agent_id)
+    if priority != previous_priority:
+        # priority is the partition key: the row moves to the new partition
+        yield "delete", "urgent_tickets_by_time", (previous_priority, agent_id, ticket_id, created_timestamp.date())
+        yield "insert", "urgent_tickets_by_time", (priority, created_timestamp.date(), ticket_id, customer_id, ticket["description"], agent_id)
+
+
+def write_ticket_updates(session, prepared, delete_urgent, tickets, previous_priorities, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Propagate updated Mongo tickets to the denormalized tables with concurrent
+    prepared statements. Returns {ticket uuid: error} for the tickets with a
+    failed write (tickets whose ids are not integers fail with ValueError).
+    """
+    errors = {}
+    statements = []
+    for ticket in tickets:
+        try:
+            rows = list(ticket_update_rows(ticket, previous_priorities[ticket["uuid"]]))
+        except (ValueError, KeyError) as e:
+            errors[ticket["uuid"]] = f"not stored in Cassandra: {e}"
+            continue
+        for kind, table, params in rows:
+            statement = delete_urgent if kind == "delete" else prepared[table]
+            statements.append((ticket["uuid"], statement, params))
+
+    results = execute_concurrent(
+        session,
+        [(statement, params) for _, statement, params in statements],
+        concurrency=concurrency,
+        raise_on_first_error=False,
+    )
+    for (ticket_uuid, _, _), (success, result) in zip(statements, results):
+        if not success:
+            errors[ticket_uuid] = str(result)
+    return errors
+
+
+def build_statements(prepared, rows, max_batch_rows=DEFAULT_MAX_BATCH_ROWS):
+    """
+    Group rows by (table, partition key). A partition with a single row is sent as
+    a plain prepared insert, bigger ones as small UNLOGGED batches that never span
+    more than one partition. Yields (table, statement, params, row_count).
+    """
+    partitions = defaultdict(list)
+    for table, params in rows:
+        key_size = INSERT_STATEMENTS[table][1]
+        partitions[(table, params[:key_size])].append(params)
+
+    for (table, _), partition_rows in partitions.items():
+        statement = prepared[table]
+        if len(partition_rows) == 1:
+            yield table, statement, partition_rows[0], 1
+            continue
+        for batch_rows in datagen.chunked(partition_rows, max_batch_rows):
+            batch = BatchStatement(batch_type=BatchType.UNLOGGED)
+            for params in batch_rows:
+                batch.add(statement, params)
+            yield table, batch, None, len(batch_rows)
+
+
+def new_stats():
+    return defaultdict(lambda: {"rows": 0, "statements": 0, "failed_rows": 0, "last_error": None})
+
+
+def write_rows(session, prepared, rows, stats, concurrency=DEFAULT_CONCURRENCY, max_batch_rows=DEFAULT_MAX_BATCH_ROWS):
+    # execute_concurrent keeps at most `concurrency` requests in flight
+    statements = list(build_statements(prepared, rows, max_batch_rows))
+    results = execute_concurrent(
+        session,
+        [(statement, params) for _, statement, params, _ in statements],
+        concurrency=concurrency,
+        raise_on_first_error=False,
+    )
+    for (table, _, _, row_count), (success, result) in zip(statements, results):
+        table_stats = stats[table]
+        table_stats["statements"] += 1
+        if success:
+            table_stats["rows"] += row_count
+        else:
+            table_stats["failed_rows"] += row_count
+            table_stats["last_error"] = str(result)
+    return stats
+
+
+def write_ticket_chunk(session, prepared, chunk, stats, concurrency=DEFAULT_CONCURRENCY, max_batch_rows=DEFAULT_MAX_BATCH_ROWS):
+    rows = [row for ticket in chunk for row in ticket_rows(ticket)]
+    return write_rows(session, prepared, rows, stats, concurrency, max_batch_rows)
+
+
+def failed_rows(stats):
+    return sum(table_stats["failed_rows"] for table_stats in stats.values())
+
+
+def print_stats(stats, seconds):
+    for table, table_stats in stats.items():
+        rate = table_stats["rows"] / seconds if seconds else 0
+        print(f"{table}: {table_stats['rows']} rows in {table_stats['statements']} statements, "
+              f"{table_stats['failed_rows']} failed ({rate:.0f} rows/sec)")
+        if table_stats["last_error"]:
+            print(f"  last error: {table_stats['last_error']}")
@@ -0,0 +1,224 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import pydgraph
+
+import datagen
+
+DEFAULT_CHUNK_SIZE = 500   # tickets per mutation (each ticket also carries one message node)
+DEFAULT_WORKERS = 4        # concurrent transactions
+MAX_RETRIES = 5
+
+
+def mutate_with_retry(client, nodes, max_retries=MAX_RETRIES):
+    # Concurrent chunks touch the same agents/customers (@reverse edges), so aborts are expected
+    for attempt in range(max_retries + 1):
+        txn = client.txn()
+        try:
+            return txn.mutate(set_obj=nodes, commit_now=True)
+        except pydgraph.AbortedError:
+            if attempt == max_retries:
+                raise
+            time.sleep(0.05 * 2 ** attempt)
+        finally:
+            txn.discard()
+
+
+def existing_uids(client, predicate, values):
+    # uid of every node whose indexed `predicate` is one of `values`, keyed by value
+    query = f"""{{
+        all(func: eq({predicate}, {json.dumps([str(value) for value in values])})) {{
+            uid
+            {predicate}
+        }}
+    }}"""
+    res = client.txn(read_only=True).query(query)
+    return {str(node[predicate]): node['uid'] for node in json.loads(res.json)['all']}
+
+
+# USERS: loaded first so tickets can point to their real uids
+def user_nodes(agent_count, customer_count):
+    for agent_id in range(1, agent_count + 1):
+        yield {'uid': f'_:agent{agent_id}', 'dgraph.type': 'User', 'username': f'agent{agent_id}', 'role': 'agent', 'agent_id': agent_id}
+    for customer_id in range(1, customer_count + 1):
+        yield {'uid': f'_:customer{customer_id}', 'dgraph.type': 'User', 'username': f'petlover{customer_id}', 'role': 'customer', 'customer_id': customer_id}
+    yield {'uid': '_:admin1', 'dgraph.type': 'User', 'username': 'admin1', 'role': 'admin', 'admin_id': 1}
+
+
+def user_key(node):
+    # Indexed predicate that identifies an already loaded user
+    for predicate in ('agent_id', 'customer_id', 'username'):
+        if predicate in node:
+            return predicate, str(node[predicate])
+
+
+def load_users(client, agent_count, customer_count, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Create the missing users in bounded mutations and return the uid map that
+    resolves the blank node names (agent1, customer1...) used by every ticket chunk.
+    Users that already exist are reused, so running it again creates nothing.
+    """
+    return load_user_nodes(client, user_nodes(agent_count, customer_count), chunk_size)
+
+
+def load_user_nodes(client, nodes, chunk_size=DEFAULT_CHUNK_SIZE):
+    uid_map = {}
+    for chunk in datagen.chunked(nodes, chunk_size):
+        found = {}
+        for predicate in ('agent_id', 'customer_id', 'username'):
+            values = [value for key, value in map(user_key, chunk) if key == predicate]
+            if values:
+                found.update({(predicate, value): uid for value, uid in existing_uids(client, predicate, values).items()})
+
+        missing = []
+        for node in chunk:
+            uid = found.get(user_key(node))
+            if uid:
+                uid_map[node['uid'][2:]] = uid
+            else:
+                missing.append(node)
+        if missing:
+            response = mutate_with_retry(client, missing)
+            uid_map.update(response.uids)
+    return uid_map
+
+
+# TICKETS
+def ticket_node(ticket, uid_map):
+    ticket_id = ticket["ticket_id"]
+    customer_uid = uid_map[f'customer{ticket["customer_id"]}']
+    return {
+        'uid': f'_:ticket{ticket_id}',
+        'dgraph.type': 'Ticket',
+        'ticket_id': ticket_id,
+        'status': ticket["status"],
+        'priority': ticket["priority"],
+        'created_at': ticket["created_timestamp"].isoformat(),
+        'assigned_to': {'uid': uid_map[f'agent{ticket["agent_id"]}']},
+        'created_by': {'uid': customer_uid},
+        'messages': [{'uid': f'_:message{ticket_id}', 'dgraph.type': 'Message', 'sender': {'uid': customer_uid}, 'message_text': 'text', 'belongs_to': {'uid': f'_:ticket{ticket_id}'}}],
+    }
+
+
+def load_chunk(client, chunk, uid_map):
+    # Tickets already in Dgraph are skipped so a chunk can safely be loaded twice
+    loaded = existing_uids(client, 'ticket_id', [ticket["ticket_id"] for ticket in chunk])
+    nodes = [ticket_node(ticket, uid_map) for ticket in chunk if str(ticket["ticket_id"]) not in loaded]
+    if nodes:
+        mutate_with_retry(client, nodes)
+    return len(chunk)
+
+
+def load_tickets(client, tickets, uid_map, chunk_size=DEFAULT_CHUNK_SIZE, workers=DEFAULT_WORKERS):
+    stats = {"tickets": 0, "failed_chunks": 0, "last_error": None, "seconds": 0.0}
+    start = time.perf_counter()
+    pending = set()
+
+    def collect(done):
+        for future in done:
+            try:
+                stats["tickets"] += future.result()
+            except Exception as e:
+                stats["failed_chunks"] += 1
+                stats["last_error"] = str(e)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for chunk in datagen.chunked(tickets, chunk_size):
+            # Never keep more than two chunks per worker in memory
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(executor.submit(load_chunk, client, chunk, uid_map))
+        collect(wait(pending).done)
+
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+# STATUS/PRIORITY UPDATES: one uid lookup and one mutation per chunk
+def update_chunk(client, chunk):
+    uids = existing_uids(client, 'ticket_id', [update["ticket_id"] for update in chunk])
+    nodes = [
+        dict({field: update[field] for field in ('status', 'priority') if update.get(field)}, uid=uids[str(update["ticket_id"])])
+        for update in chunk if str(update["ticket_id"]) in uids
+    ]
+    if nodes:
+        mutate_with_retry(client, nodes)
+    return {str(update["ticket_id"]) for update in chunk} - set(uids)
+
+
+def update_tickets(client, updates, chunk_size=DEFAULT_CHUNK_SIZE, workers=DEFAULT_WORKERS):
+    """
+    Set status/priority of many tickets with concurrent chunked mutations.
+    Returns {ticket_id: error} for the tickets that are missing or whose chunk failed.
+    """
+    errors = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        chunks = list(datagen.chunked(updates, chunk_size))
+        futures = [executor.submit(update_chunk, client, chunk) for chunk in chunks]
+        for chunk, future in zip(chunks, futures):
+            try:
+                for ticket_id in future.result():
+                    errors[ticket_id] = "ticket not found in Dgraph"
+            except Exception as e:
+                errors.update({str(update["ticket_id"]): str(e) for update in chunk})
+    return errors
+
+
+# IMPORTED RECORDS (documents validated with the Mongo models)
+def imported_user_node(user):
+    # Mongo agent ids carry a trailing "_" ("3_"), customers are plain ("3")
+    if user["role"] == "agent":
+        user_id = user["uuid"].rstrip("_")
+        return {'uid': f'_:agent{user_id}', 'dgraph.type': 'User', 'username': user["username"], 'email': user["email"], 'role': 'agent', 'agent_id': user_id}
+    if user["role"] == "customer":
+        return {'uid': f'_:customer{user["uuid"]}', 'dgraph.type': 'User', 'username': user["username"], 'email': user["email"], 'role': 'customer', 'customer_id': user["uuid"]}
+    return {'uid': f'_:{user["role"]}{user["uuid"]}', 'dgraph.type': 'User', 'username': user["username"], 'email': user["email"], 'role': user["role"]}
+
+
+def load_imported_tickets(client, tickets):
+    # Link each new ticket to its (already loaded) customer, skip tickets already in Dgraph
+    loaded = existing_uids(client, 'ticket_id', [ticket["uuid"] for ticket in tickets])
+    customers = existing_uids(client, 'customer_id', {ticket["customer_id"] for ticket in tickets})
+    nodes = []
+    for ticket in tickets:
+        if ticket["uuid"] in loaded:
+            continue
+        node = {
+            'uid': f'_:ticket{ticket["uuid"]}',
+            'dgraph.type': 'Ticket',
+            'ticket_id': ticket["uuid"],
+            'status': ticket["status"],
+            'priority': ticket["priority"],
+            'created_at': ticket["created_timestamp"].isoformat(),
+            'updated_at': ticket["updated_timestamp"].isoformat(),
+        }
+        if ticket["customer_id"] in customers:
+            node['created_by'] = {'uid': customers[ticket["customer_id"]]}
+        nodes.append(node)
+    if nodes:
+        mutate_with_retry(client, nodes)
+    return len(nodes)
+
+
+def load_imported_assignments(client, assignments):
+    # Assignments only add the assigned_to edge between existing tickets and agents
+    tickets = existing_uids(client, 'ticket_id', {assignment["ticket_id"] for assignment in assignments})
+    agents = existing_uids(client, 'agent_id', {assignment["agent_id"].rstrip("_") for assignment in assignments})
+    nodes = [
+        {'uid': tickets[assignment["ticket_id"]], 'assigned_to': {'uid': agents[assignment["agent_id"].rstrip("_")]}}
+        for assignment in assignments
+        if assignment["ticket_id"] in tickets and assignment["agent_id"].rstrip("_") in agents
+    ]
+    if nodes:
+        mutate_with_retry(client, nodes)
+    return len(nodes)
+
+
+def print_stats(stats):
+    rate = stats["tickets"] / stats["seconds"] if stats["seconds"] else 0
+    print(f"Dgraph: {stats['tickets']} tickets, {stats['failed_chunks']} failed chunks "
+          f"in {stats['seconds']:.2f}s ({rate:.0f} tickets/sec)")
+    if stats["last_error"]:
+        print(f"  last error: {stats['last_error']}")
@@ -69,26 +69,6 @@ from datetime import datetime
 import uuid
 from datetime import datetime
 
-def create_data(client, ticket_data, agent_ids, customer_ids):
-    txn = client.txn()
-    try:
-        # Dgraph user data
-        data = [
-            {'uid': f'_:agent1', 'dgraph.type': 'User', 'username': 'agent1', 'role': 'agent', 'agent_id': agent_ids[0]},
-            {'uid': f'_:agent2', 'dgraph.type': 'User', 'username': 'agent2', 'role': 'agent', 'agent_id': agent_ids[1]},
-            {'uid': f'_:customer1', 'dgraph.type': 'User', 'username': 'petlover1', 'role': 'customer', 'customer_id': customer_ids[0]},
-            {'uid': f'_:customer2', 'dgraph.type': 'User', 'username': 'petlover2', 'role': 'customer', 'customer_id': customer_ids[1]},
-            {'uid': f'_:admin1', 'dgraph.type': 'User', 'username': 'admin1', 'role': 'admin', 'admin_id': 1},
-            
-        ] + ticket_data
-
-        # Mutate and commit
-        txn.mutate(set_obj=data)
-        txn.commit()
-        print("Dgraph data insertion complete!")
-    finally:
-        txn.discard()
-
 def create_message(client, message_data, customer_id, ticket_id):
     txn = client.txn()
     ticket_data = search_ticket(client, ticket_id)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from pymongo import UpdateOne
+
+# Agent -> ticket ids index shared by the agent routes.
+# Bounded LRU: least recently used agents are evicted past the size, and entries
+# expire after the TTL so assignments written outside the API (bulk load,
+# import_data.py) show up without a restart.
+ASSIGNMENT_CACHE_SIZE = int(os.getenv("ASSIGNMENT_CACHE_SIZE", "1024"))
+ASSIGNMENT_CACHE_TTL = float(os.getenv("ASSIGNMENT_CACHE_TTL", "60"))
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def fetch_ticket_ids(db, agent_id):
+    # Covered by agent_id_index, only ticket_id comes back
+    return frozenset(a["ticket_id"] for a in db.agent_assignments.find({"agent_id": agent_id}, {"_id": 0, "ticket_id": 1}))
+
+
+def agent_ticket_ids(db, agent_id):
+    """Ticket ids assigned to the agent, from the cache when the entry is still fresh."""
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(agent_id)
+        if entry and entry[0] > now:
+            _cache.move_to_end(agent_id)
+            return entry[1]
+
+    ticket_ids = fetch_ticket_ids(db, agent_id)
+    with _lock:
+        _cache[agent_id] = (now + ASSIGNMENT_CACHE_TTL, ticket_ids)
+        _cache.move_to_end(agent_id)
+        while len(_cache) > ASSIGNMENT_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return ticket_ids
+
+
+def set_ticket_assignees(db, assignments):
+    """
+    Copy agent_id and assigned_timestamp of new assignments onto their tickets.
+    A ticket keeps the assignee of its latest assignment.
+    """
+    updates = [
+        UpdateOne(
+            {"uuid": a["ticket_id"], "$or": [{"assigned_timestamp": None}, {"assigned_timestamp": {"$lte": a["assigned_timestamp"]}}]},
+            {"$set": {"agent_id": a["agent_id"], "assigned_timestamp": a["assigned_timestamp"]}, "$inc": {"version": 1}},
+        )
+        for a in assignments
+    ]
+    if updates:
+        db.tickets.bulk_write(updates, ordered=False)
+
+
+def invalidate(agent_ids=None):
+    # Drop the given agents, or the whole index when agent_ids is None
+    with _lock:
+        if agent_ids is None:
+            _cache.clear()
+        else:
+            for agent_id in agent_ids:
+                _cache.pop(agent_id, None)
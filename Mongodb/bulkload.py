@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+import time
+
+from pymongo.errors import BulkWriteError
+
+import datagen
+from .modelmongo import priority_rank
+
+DEFAULT_BATCH_SIZE = 1000
+DUPLICATE_KEY_ERROR = 11000
+
+
+# DOCUMENTS BUILT FROM THE GENERATED RECORDS (same shape the POST routes store)
+def user_document(user):
+    user_uuid = f"{user['user_id']}_" if user["role"] == "agent" else f"{user['user_id']}"
+    return {
+        "uuid": user_uuid,
+        "username": user["username"],
+        "email": user["email"],
+        "role": user["role"],
+        "profile": {"name": user["name"]},
+    }
+
+
+def ticket_document(ticket):
+    return {
+        "uuid": str(ticket["ticket_id"]),
+        "customer_id": str(ticket["customer_id"]),
+        "description": ticket["description"],
+        "status": ticket["status"],
+        "priority": ticket["priority"],
+        "created_timestamp": ticket["created_timestamp"],
+        "updated_timestamp": ticket["created_timestamp"],
+        "category": "technical",
+        "messages": [],
+        "feedback": {"rating": ticket["feedback_rating"]},
+        "resolution_steps": [],
+        "channel": ticket["support_channel"],
+        # Assignee copied from assignment_document so the agent routes need no $lookup
+        "agent_id": str(ticket["agent_id"]),
+        "assigned_timestamp": ticket["created_timestamp"],
+        "priority_rank": priority_rank(ticket["priority"]),
+    }
+
+
+def assignment_document(ticket):
+    return {
+        "uuid": ticket["assignment_uuid"],
+        "agent_id": str(ticket["agent_id"]),
+        "ticket_id": str(ticket["ticket_id"]),
+        "assigned_timestamp": ticket["created_timestamp"],
+        "priority_level": ticket["priority"],
+    }
+
+
+# BATCHED WRITES
+def new_stats():
+    return {"inserted": 0, "duplicates": 0, "failed": 0, "seconds": 0.0}
+
+
+def insert_batch(collection, documents, stats):
+    # Unordered so one duplicate does not stop the rest of the batch, returns the documents inserted
+    start = time.perf_counter()
+    failed = set()
+    try:
+        result = collection.insert_many(documents, ordered=False)
+        stats["inserted"] += len(result.inserted_ids)
+    except BulkWriteError as e:
+        details = e.details
+        duplicates = sum(1 for error in details["writeErrors"] if error["code"] == DUPLICATE_KEY_ERROR)
+        stats["inserted"] += details["nInserted"]
+        stats["duplicates"] += duplicates
+        stats["failed"] += len(details["writeErrors"]) - duplicates
+        failed = {error["index"] for error in details["writeErrors"]}
+    stats["seconds"] += time.perf_counter() - start
+    return [document for index, document in enumerate(documents) if index not in failed]
+
+
+def bulk_load(collection, documents, batch_size=DEFAULT_BATCH_SIZE, stats=None):
+    stats = stats if stats is not None else new_stats()
+    for batch in datagen.chunked(documents, batch_size):
+        insert_batch(collection, batch, stats)
+    return stats
+
+
+def load_users(db, users, batch_size=DEFAULT_BATCH_SIZE):
+    return bulk_load(db.users, (user_document(user) for user in users), batch_size)
+
+
+def load_ticket_chunk(db, chunk, stats, batch_size=DEFAULT_BATCH_SIZE):
+    # Tickets and their assignment are written batch by batch from the same chunk
+    for batch in datagen.chunked(chunk, batch_size):
+        insert_batch(db.tickets, [ticket_document(ticket) for ticket in batch], stats["tickets"])
+        insert_batch(db.agent_assignments, [assignment_document(ticket) for ticket in batch], stats["agent_assignments"])
+    return stats
+
+
+def print_stats(name, stats):
+    rate = stats["inserted"] / stats["seconds"] if stats["seconds"] else 0
+    print(f"{name}: {stats['inserted']} inserted, {stats['duplicates']} duplicates, "
+          f"{stats['failed']} failed in {stats['seconds']:.2f}s ({rate:.0f} docs/sec)")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+from concurrent.futures import ThreadPoolExecutor
+
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+import datagen
+from Cassandra import writer
+from DGraph import loaderdgraph
+from . import reports
+from .modelmongo import priority_rank
+
+BULK_UPDATE_MAX_ITEMS = 10000
+PROPAGATION_CHUNK_SIZE = 1000
+UPDATE_WORKERS = 16  # Mongo updates in flight
+
+# Fields the Cassandra rows and the report rollups are rebuilt from
+TICKET_FIELDS = {"_id": 0, "uuid": 1, "customer_id": 1, "description": 1, "status": 1, "priority": 1,
+                 "created_timestamp": 1, "agent_id": 1, "assigned_timestamp": 1, "channel": 1}
+
+# Cassandra statements are prepared once per session
+_prepared = {}
+
+
+def prepared_statements(session):
+    if session not in _prepared:
+        _prepared[session] = (writer.prepare_inserts(session), session.prepare(writer.DELETE_URGENT_TICKET))
+    return _prepared[session]
+
+
+def propagate_cassandra(session, tickets, previous_priorities):
+    prepared, delete_urgent = prepared_statements(session)
+    errors = {}
+    for chunk in datagen.chunked(tickets, PROPAGATION_CHUNK_SIZE):
+        errors.update(writer.write_ticket_updates(session, prepared, delete_urgent, chunk, previous_priorities))
+    return errors
+
+
+def update_ticket(db, ticket_id, update):
+    # Pre-image of the atomic update: the rollups move from the state this update replaced
+    update = dict(update)
+    if "priority" in update:
+        update["priority_rank"] = priority_rank(update["priority"])
+    return db.tickets.find_one_and_update({"uuid": ticket_id}, {"$set": update, "$inc": {"version": 1}},
+                                          TICKET_FIELDS, return_document=ReturnDocument.BEFORE)
+
+
+def bulk_update_tickets(db, items, cassandra_session=None, dgraph_client=None):
+    """
+    Apply status/priority updates with UPDATE_WORKERS concurrent
+    find_one_and_update calls, each one returning the ticket before its update,
+    then propagate the updated tickets to Cassandra and Dgraph concurrently.
+    Several items of the same ticket are merged into one update, a later item
+    winning on the fields both set, and share its result.
+    Returns one result per item (in order) and the customer ids of the updated tickets.
+    """
+    results = {}
+    invalid = {}
+    fields = {}
+    for index, item in enumerate(items):
+        update = {field: getattr(item, field) for field in ("status", "priority") if getattr(item, field)}
+        if update:
+            fields.setdefault(item.ticket_id, {}).update(update)
+        else:
+            invalid[index] = {"ticket_id": item.ticket_id, "result": "invalid", "error": "status or priority is required"}
+
+    previous = {}
+    with ThreadPoolExecutor(max_workers=UPDATE_WORKERS) as executor:
+        futures = {ticket_id: executor.submit(update_ticket, db, ticket_id, update) for ticket_id, update in fields.items()}
+    for ticket_id, future in futures.items():
+        try:
+            previous[ticket_id] = future.result()
+        except PyMongoError as e:
+            results[ticket_id] = {"ticket_id": ticket_id, "result": "failed", "error": str(e)}
+            continue
+        if previous[ticket_id] is None:
+            del previous[ticket_id]
+            results[ticket_id] = {"ticket_id": ticket_id, "result": "not_found"}
+
+    updated = [ticket_id for ticket_id in fields if ticket_id in previous]
+    tickets = [dict(previous[ticket_id], **fields[ticket_id]) for ticket_id in updated]
+    previous_priorities = {ticket_id: previous[ticket_id]["priority"] for ticket_id in updated}
+    reports.count_moved(db, [(previous[ticket["uuid"]], ticket) for ticket in tickets])
+
+    # Both stores are written at the same time, each one with its own batching
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        cassandra = executor.submit(propagate_cassandra, cassandra_session, tickets, previous_priorities) if cassandra_session and tickets else None
+        dgraph = executor.submit(loaderdgraph.update_tickets, dgraph_client, [dict(fields[ticket_id], ticket_id=ticket_id) for ticket_id in updated]) if dgraph_client and tickets else None
+        cassandra_errors = cassandra.result() if cassandra else None
+        dgraph_errors = dgraph.result() if dgraph else None
+
+    for ticket_id in updated:
+        results[ticket_id] = {
+            "ticket_id": ticket_id,
+            "result": "updated",
+            "cassandra": None if cassandra_errors is None else cassandra_errors.get(ticket_id, "updated"),
+            "dgraph": None if dgraph_errors is None else dgraph_errors.get(ticket_id, "updated"),
+        }
+
+    customer_ids = {previous[ticket_id]["customer_id"] for ticket_id in updated}
+    return [invalid.get(index) or results[item.ticket_id] for index, item in enumerate(items)], customer_ids
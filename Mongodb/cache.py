@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from fastapi.encoders import jsonable_encoder
+
+# Read-through cache of route results.
+# RESPONSE_CACHE_BACKEND: "memory" (in-process LRU, default), "redis" (shared by
+# every API process, needs the redis package) or "off".
+# Entries are tagged ("tickets", "customer:<id>"...). Writes bump the version of
+# the tags they affect, so every entry read with an older version is never hit
+# again and ages out with the LRU/TTL. Writes made outside the API (bulk load,
+# imports) are only picked up once the TTL expires.
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "redis://localhost:6379/0")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "4096"))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "30"))
+
+
+class MemoryBackend:
+    name = "memory"
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        # tag: (version, bump time), oldest bump first. Versions come from one
+        # counter and are never reused, so a tag can be forgotten once every
+        # entry cached before its last bump has expired: it then reads 0 again.
+        self.versions = OrderedDict()
+        self.counter = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if not entry or entry[0] < time.monotonic():
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def tag_versions(self, tags):
+        with self.lock:
+            return [self.versions.get(tag, (0, None))[0] for tag in tags]
+
+    def bump(self, tags):
+        with self.lock:
+            now = time.monotonic()
+            for tag in tags:
+                self.counter += 1
+                self.versions[tag] = (self.counter, now)
+                self.versions.move_to_end(tag)
+            while self.versions and next(iter(self.versions.values()))[1] + self.ttl < now:
+                self.versions.popitem(last=False)
+
+
+class RedisBackend:
+    name = "redis"
+
+    def __init__(self, url, ttl):
+        import redis  # optional dependency, only needed with RESPONSE_CACHE_BACKEND=redis
+        self.redis = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key):
+        value = self.redis.get("cache:" + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value):
+        self.redis.set("cache:" + key, json.dumps(value), ex=self.ttl)
+
+    def tag_versions(self, tags):
+        return [int(version or 0) for version in self.redis.mget(["tag:" + tag for tag in tags])]
+
+    def bump(self, tags):
+        pipeline = self.redis.pipeline()
+        for tag in tags:
+            pipeline.incr("tag:" + tag)
+        pipeline.execute()
+
+
+def create_backend():
+    if RESPONSE_CACHE_BACKEND == "off":
+        return None
+    if RESPONSE_CACHE_BACKEND == "redis":
+        return RedisBackend(RESPONSE_CACHE_URL, RESPONSE_CACHE_TTL)
+    return MemoryBackend(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+
+backend = create_backend()
+_metrics = defaultdict(lambda: {"hits": 0, "misses": 0})
+_metrics_lock = threading.Lock()
+
+
+def cache_key(route, params, tags, versions):
+    params_key = json.dumps(params, sort_keys=True, default=str)
+    tags_key = ",".join(f"{tag}@{version}" for tag, version in zip(tags, versions))
+    return f"{route}|{params_key}|{tags_key}"
+
+
+def cached(route, params, tags, compute):
+    """
+    Result of compute() for the route and params, from the cache while none of
+    the tags was invalidated. Values are stored JSON encoded so both backends
+    return the same thing.
+    """
+    if backend is None:
+        return compute()
+
+    key = cache_key(route, params, tags, backend.tag_versions(tags))
+    value = backend.get(key)
+    with _metrics_lock:
+        _metrics[route]["hits" if value is not None else "misses"] += 1
+    if value is None:
+        value = jsonable_encoder(compute())
+        backend.set(key, value)
+    return value
+
+
+def invalidate(*tags):
+    if backend is not None and tags:
+        backend.bump(tags)
+
+
+def metrics():
+    with _metrics_lock:
+        routes = {route: dict(counts) for route, counts in _metrics.items()}
+    hits = sum(counts["hits"] for counts in routes.values())
+    misses = sum(counts["misses"] for counts in routes.values())
+    return {
+        "backend": backend.name if backend else "off",
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+        "routes": routes,
+    }
@@ -33,13 +33,45 @@ def print_object(objects):
     else:
         print("Unsupported object type.")
 
+# CONDITIONAL GETS: the last response of every URL that had an ETag is kept and
+# revalidated with If-None-Match, a 304 reuses it without downloading the body again
+etag_cache = {}
+
+def conditional_get(url, params=None):
+    key = requests.Request("GET", url, params=params).prepare().url
+    cached = etag_cache.get(key)
+    headers = {"If-None-Match": cached.headers["ETag"]} if cached is not None else {}
+    response = requests.get(key, headers=headers)
+    if response.status_code == 304 and cached is not None:
+        return cached
+    if response.ok and "ETag" in response.headers:
+        etag_cache[key] = response
+    return response
+
+# FUNCTION TO READ EVERY PAGE OF A PAGINATED ROUTE
+def get_all_pages(endpoint, params=None):
+    """
+    Follow next_cursor until the last page.
+    Returns the last response (to check for errors) and the items of all the pages.
+    """
+    params = dict(params or {})
+    items = []
+    while True:
+        response = conditional_get(endpoint, params)
+        if not response.ok:
+            return response, items
+        page = response.json()
+        items.extend(page.get("items", []))
+        if not page.get("next_cursor"):
+            return response, items
+        params["cursor"] = page["next_cursor"]
+
 # FUNCTION TO GET ALL USERS FOR OTHER FUNCTIONS
 def get_all_users():
     endpoint = f"{PROJECT_API_URL}/users"
-    response = requests.get(endpoint)
+    response, users = get_all_pages(endpoint)
 
     if response.ok:
-        users = response.json()
         print("All Users (ID and Name):")
         for user in users:
             print(f"UUID: {user['uuid']}, Username: {user['username']}")
@@ -49,10 +81,9 @@ def get_all_users():
 # FUNCTION TO GET ALL CUSTOMERS FOR AGENTS
 def get_all_customers():
     endpoint = f"{PROJECT_API_URL}/users/customers"
-    response = requests.get(endpoint)
+    response, customers = get_all_pages(endpoint)
 
     if response.ok:
-        customers = response.json()
         print("All Customers (ID and Name):")
         for customer in customers:
             print(f"UUID: {customer['uuid']}, Username: {customer['username']}")
@@ -133,11 +164,10 @@ def search_ticket_by(agent_id):
 
     # Send the request to the API endpoint
     endpoint = PROJECT_API_URL + suffix
-    response = requests.get(endpoint)
+    response, json_resp = get_all_pages(endpoint)
 
     print("\nTickets:\n")
     if response.ok:
-        json_resp = response.json()
         if isinstance(json_resp, list):  
             if json_resp:  
                 for ticket in json_resp:
@@ -183,10 +213,9 @@ def search_ticket_admin_by():
         suffix = f"/tickets/admins/priority/{priority}"
 
     endpoint = PROJECT_API_URL + suffix
-    response = requests.get(endpoint)
+    response, json_resp = get_all_pages(endpoint)
     print("\nTickets:\n")
     if response.ok:
-        json_resp = response.json()
         if isinstance(json_resp, list):  
             if json_resp:  
                 for ticket in json_resp:
@@ -203,9 +232,8 @@ def search_ticket_admin_by():
 def get_tickets_by_agent(agent_id):
     suffix = f"/tickets/agent/{agent_id}"
     endpoint = PROJECT_API_URL + suffix
-    response = requests.get(endpoint)
+    response, tickets = get_all_pages(endpoint)
     if response.ok:
-        tickets = response.json()
         if tickets:
             print(f"Tickets assigned to Agent {agent_id}:")
             for ticket in tickets:
@@ -408,6 +436,28 @@ def update_ticket_in_dgraph(dgraph_client, ticket_id, update_data):
         print(f"Error: {e}")
 
 
+# FUNCTION TO UPDATE MANY TICKETS AT ONCE (the API propagates to Cassandra and Dgraph)
+def bulk_update_tickets():
+    ticket_ids = [ticket_id.strip() for ticket_id in input("Ticket IDs to update (comma separated): ").split(",") if ticket_id.strip()]
+    status = input("New status [open, resolved, in_progress] (blank to keep): ").strip() or None
+    priority = input("New priority [high, medium, low] (blank to keep): ").strip() or None
+    if not ticket_ids or not (status or priority):
+        print("No valid updates provided. Exiting.")
+        return
+
+    updates = [{"ticket_id": ticket_id, "status": status, "priority": priority} for ticket_id in ticket_ids]
+    response = requests.post(f"{PROJECT_API_URL}/tickets/bulk_update", json=updates)
+    if response.ok:
+        results = response.json()
+        updated = sum(1 for result in results if result["result"] == "updated")
+        print(f"{updated} of {len(results)} tickets updated")
+        for result in results:
+            if result["result"] != "updated" or result.get("cassandra", "updated") != "updated" or result.get("dgraph", "updated") != "updated":
+                print_object(result)
+    else:
+        print(f"Error: {response.status_code} - {response.text}")
+
+
 # FUNCTIONS FOR AGGREGATIONS
 def fetch_recent_admin_tickets():
     url = f"{PROJECT_API_URL}/tickets/admins/recent"
@@ -496,7 +546,7 @@ def get_ticket_feedback(agent_id):
         ticket_uuid = input("Enter Desired Ticket ID: ")
         url = f"{PROJECT_API_URL}/tickets/{ticket_uuid}/feedback?agent_id={agent_id}"  
         
-        response = requests.get(url)
+        response = conditional_get(url)
 
         if response.status_code == 200:
             feedback = response.json()
@@ -514,18 +564,22 @@ def get_ticket_feedback(agent_id):
 
 def get_ticket_admin_feedback():
     try:
-        ticket_uuid = input("Enter desired Ticket ID: ")
-        url = f"{PROJECT_API_URL}/tickets/admins/{ticket_uuid}/feedback"  
-        
-        response = requests.get(url)
+        ticket_uuids = [ticket_uuid.strip() for ticket_uuid in input("Enter desired Ticket ID(s), comma separated: ").split(",") if ticket_uuid.strip()]
+        # One request for all the tickets instead of one per ticket
+        response = requests.post(f"{PROJECT_API_URL}/tickets/batch_get", json={"ids": ticket_uuids, "fields": ["feedback"]})
 
         if response.status_code == 200:
-            feedback = response.json()
-            print("Ticket Feedback:")
-            print(f"Rating: {feedback.get('rating')}")
-            print(f"Comments: {feedback.get('comments')}")
-            print(f"Submitted Timestamp: {feedback.get('submitted_timestamp')}")
-            print("=" * 50)
+            results = response.json()["results"]
+            for ticket_uuid, ticket in results.items():
+                if ticket is None:
+                    print(f"Ticket {ticket_uuid} not found")
+                    continue
+                feedback = ticket.get("feedback") or {}
+                print(f"Ticket {ticket_uuid} Feedback:")
+                print(f"Rating: {feedback.get('rating')}")
+                print(f"Comments: {feedback.get('comments')}")
+                print(f"Submitted Timestamp: {feedback.get('submitted_timestamp')}")
+                print("=" * 50)
 
         else:
             print(f"Error: {response.status_code} - {response.text}")
@@ -560,7 +614,7 @@ def fetch_daily_report(report_date):
     url = f"{PROJECT_API_URL}/daily_reports/{report_date}"
 
     try:
-        response = requests.get(url)
+        response = conditional_get(url)
 
         if response.status_code == 200:
             report = response.json()
@@ -571,6 +625,12 @@ def fetch_daily_report(report_date):
             print("Channel Stats:")
             for channel, count in report["channel_stats"].items():
                 print(f"  {channel.capitalize()}: {count}")
+            print("Status Stats:")
+            for ticket_status, count in report.get("status_stats", {}).items():
+                print(f"  {ticket_status.capitalize()}: {count}")
+            print("Priority Stats:")
+            for priority, count in report.get("priority_stats", {}).items():
+                print(f"  {priority.capitalize()}: {count}")
         else:
             print(f"Error: {response.status_code} - {response.text}")
     
@@ -680,10 +740,9 @@ def fetch_tickets_by_customer():
     url = f"{PROJECT_API_URL}/tickets/customer/{customer_id}"
 
     try:
-        response = requests.get(url)
+        response, tickets = get_all_pages(url)
 
         if response.status_code == 200:
-            tickets = response.json()
             print(f"Tickets for customer ID {customer_id}:")
             for ticket in tickets:
                 print(f"- Ticket ID: {ticket['uuid']}, Priority: {ticket['priority']}, Status: {ticket['status']}")
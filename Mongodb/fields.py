@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+from fastapi import HTTPException, Query
+
+# ?fields=status,priority on the ticket read routes: only those fields are read
+# from Mongo (uuid always is) and serialized with the slim TicketView models.
+FieldsQuery = Query(None, description="Comma separated fields to return, uuid is always returned")
+
+# ALLOW-LISTS of every route family
+TICKET_FIELDS = ("uuid", "customer_id", "description", "status", "priority", "created_timestamp", "updated_timestamp",
+                 "category", "channel", "feedback", "resolution_steps", "agent_id", "assigned_timestamp",
+                 "priority_rank", "version")
+# Customers never saw the creation time of their tickets
+CUSTOMER_TICKET_FIELDS = tuple(field for field in TICKET_FIELDS if field != "created_timestamp")
+# Agent overview, recent and priority level lists
+SUMMARY_TICKET_FIELDS = ("uuid", "customer_id", "status", "priority", "agent_id", "category", "channel",
+                         "created_timestamp", "updated_timestamp")
+SEARCH_TICKET_FIELDS = ("uuid", "customer_id", "description", "status", "priority", "category", "channel",
+                        "created_timestamp")
+
+
+def projection(fields, allowed, default, always=("uuid",)):
+    """
+    Mongo projection of the requested fields, or the default projection of the
+    route when none are requested. Fields outside the allow-list are a 400.
+    """
+    if not fields:
+        return default
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = sorted(set(requested) - set(allowed))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}")
+    return {"_id": 0, **{field: 1 for field in (*always, *requested)}}
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+import argparse
+import os
+from datetime import datetime
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel, MongoClient
+from pymongo.errors import OperationFailure
+
+MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017')
+DB_NAME = os.getenv('MONGODB_DB_NAME', 'final_project')
+
+# INDEX REGISTRY: every index the routes and loaders rely on, per collection.
+# Compound indexes put the equality field first and the sort field second so the
+# paginated routes (sorted by uuid) and the recent routes (sorted by
+# created_timestamp) read the index in order instead of sorting in memory.
+# The created_from/created_to windows of the ticket list routes are paged on
+# (created_timestamp, uuid), hence the (<filter>, created_timestamp, uuid) indexes.
+INDEXES = {
+    "users": [
+        IndexModel([("uuid", ASCENDING)], unique=True, name="user_id_unique_index"),
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique_index"),
+        # /users/customers
+        IndexModel([("role", ASCENDING), ("uuid", ASCENDING)], name="role_uuid_index"),
+    ],
+    "tickets": [
+        IndexModel([("uuid", ASCENDING)], unique=True, name="ticket_id_unique_index"),
+        IndexModel([("category", ASCENDING)], name="category_index"),
+        # /tickets/admins/status/{status}, /tickets/admins/priority/{priority}
+        IndexModel([("status", ASCENDING), ("uuid", ASCENDING)], name="status_uuid_index"),
+        IndexModel([("priority", ASCENDING), ("uuid", ASCENDING)], name="priority_uuid_index"),
+        # /tickets/customer/{customer_id}, /tickets/admins/customerID/{customer_id}
+        IndexModel([("customer_id", ASCENDING), ("uuid", ASCENDING)], name="customer_uuid_index"),
+        # /tickets/admins/recent and the created_* windows of the filters
+        IndexModel([("status", ASCENDING), ("created_timestamp", ASCENDING), ("uuid", ASCENDING)], name="status_created_uuid_index"),
+        IndexModel([("priority", ASCENDING), ("created_timestamp", ASCENDING), ("uuid", ASCENDING)], name="priority_created_uuid_index"),
+        IndexModel([("customer_id", ASCENDING), ("created_timestamp", ASCENDING), ("uuid", ASCENDING)], name="customer_created_uuid_index"),
+        # /tickets/recent (agent_id is denormalized from agent_assignments)
+        IndexModel([("agent_id", ASCENDING), ("status", ASCENDING), ("created_timestamp", DESCENDING)], name="agent_status_created_index"),
+        # /tickets/priority_level, /tickets/admins/priority_level
+        IndexModel([("agent_id", ASCENDING), ("priority_rank", ASCENDING), ("created_timestamp", DESCENDING)], name="agent_priority_created_index"),
+        IndexModel([("priority_rank", ASCENDING), ("created_timestamp", ASCENDING)], name="priority_rank_created_index"),
+        # /tickets/search (a collection has at most one text index)
+        IndexModel([("description", TEXT), ("resolution_steps", TEXT)], weights={"description": 10, "resolution_steps": 5}, name="ticket_text_index"),
+        # /daily_reports/build, created_* windows of /tickets/
+        IndexModel([("created_timestamp", ASCENDING), ("uuid", ASCENDING)], name="created_uuid_index"),
+    ],
+    "agent_assignments": [
+        IndexModel([("uuid", ASCENDING)], unique=True, name="assignment_id_unique_index"),
+        IndexModel([("priority_level", ASCENDING)], name="priority_level_index"),
+        # Agent -> ticket ids index, covered by the index
+        IndexModel([("agent_id", ASCENDING), ("ticket_id", ASCENDING)], name="agent_ticket_index"),
+        # $lookup from tickets (foreignField ticket_id)
+        IndexModel([("ticket_id", ASCENDING)], name="ticket_id_index"),
+    ],
+    # GET /tickets/{ticket_uuid}/messages, and the open bucket lookup of POST
+    "message_buckets": [
+        IndexModel([("ticket_id", ASCENDING), ("start", ASCENDING)], name="ticket_start_index"),
+        # /tickets/search
+        IndexModel([("messages.message_text", TEXT)], name="message_text_index"),
+    ],
+    # One document per rollup, updated by key on every ticket write
+    "ticket_rollups": [
+        IndexModel([("day", ASCENDING), ("channel", ASCENDING), ("status", ASCENDING), ("priority", ASCENDING)], unique=True, name="rollup_key_unique_index"),
+    ],
+    "daily_reports": [
+        IndexModel([("uuid", ASCENDING)], unique=True, name="report_id_unique_index"),
+        IndexModel([("report_date", ASCENDING)], unique=True, name="report_date_index"),
+    ],
+}
+
+# Indexes of older versions that a compound index above now covers
+RETIRED_INDEXES = {
+    "tickets": ["status_index", "priority_index"],
+    "agent_assignments": ["agent_id_index"],
+}
+
+# Migration that removes the duplicates a unique index of the collection fails on
+DEDUPE_MIGRATIONS = {
+    "daily_reports": "daily_reports",
+}
+DUPLICATE_KEY = 11000
+
+# QUERY SHAPES of the routes: (route, collection, filter, sort). The values only
+# have to be of the right type, explain() does not need matching documents.
+DAY, NEXT_DAY = datetime(2024, 1, 1), datetime(2024, 1, 2)
+CREATED_SORT = [("created_timestamp", ASCENDING), ("uuid", ASCENDING)]
+QUERY_SHAPES = [
+    ("GET /users/customers", "users", {"role": "customer"}, [("uuid", ASCENDING)]),
+    ("GET /tickets/", "tickets", {}, [("uuid", ASCENDING)]),
+    ("GET /tickets/admins/status/{status}", "tickets", {"status": "open"}, [("uuid", ASCENDING)]),
+    ("GET /tickets/admins/priority/{priority}", "tickets", {"priority": "high"}, [("uuid", ASCENDING)]),
+    ("GET /tickets/customer/{customer_id}", "tickets", {"customer_id": "1"}, [("uuid", ASCENDING)]),
+    ("GET /tickets/status/{status}", "tickets", {"status": "open", "uuid": {"$in": ["1", "2"]}}, [("uuid", ASCENDING)]),
+    ("GET /tickets/admins/recent", "tickets", {"status": "open"}, [("created_timestamp", ASCENDING)]),
+    ("GET /tickets/recent", "tickets", {"agent_id": "1", "status": "open"}, [("created_timestamp", DESCENDING)]),
+    ("GET /tickets/priority_level", "tickets", {"agent_id": "1"}, [("priority_rank", ASCENDING), ("created_timestamp", DESCENDING)]),
+    ("GET /tickets/admins/priority_level", "tickets", {"agent_id": {"$ne": None}}, [("priority_rank", ASCENDING), ("created_timestamp", ASCENDING)]),
+    ("GET /tickets/?created_from=", "tickets", {"created_timestamp": {"$gte": DAY, "$lt": NEXT_DAY}}, CREATED_SORT),
+    ("GET /tickets/admins/status/{status}?created_from=", "tickets", {"status": "open", "created_timestamp": {"$gte": DAY}}, CREATED_SORT),
+    ("GET /tickets/admins/priority/{priority}?created_from=", "tickets", {"priority": "high", "created_timestamp": {"$gte": DAY}}, CREATED_SORT),
+    ("GET /tickets/customer/{customer_id}?created_from=", "tickets", {"customer_id": "1", "created_timestamp": {"$lt": NEXT_DAY}}, CREATED_SORT),
+    ("POST /daily_reports/build", "tickets", {"created_timestamp": {"$gte": DAY, "$lt": NEXT_DAY}}, None),
+    ("agent assignment index", "agent_assignments", {"agent_id": "1_"}, None),
+    ("$lookup agent_assignments", "agent_assignments", {"ticket_id": "1"}, None),
+    ("GET /tickets/search", "tickets", {"$text": {"$search": "password"}}, None),
+    ("GET /tickets/search", "message_buckets", {"$text": {"$search": "password"}}, None),
+    ("GET /tickets/{ticket_uuid}/messages", "message_buckets", {"ticket_id": "1"}, [("start", ASCENDING), ("_id", ASCENDING)]),
+    ("GET /daily_reports/{report_date}", "ticket_rollups", {"day": {"$gte": DAY, "$lte": NEXT_DAY}}, None),
+    ("$inc ticket_rollups", "ticket_rollups", {"day": DAY, "channel": "chat", "status": "open", "priority": "high"}, None),
+]
+
+
+def index_key(spec):
+    # A text index is listed as (_fts, _ftsx) keys, its fields are in the weights
+    key = list(spec["key"].items())
+    if TEXT in spec["key"].values():
+        return [("_fts", TEXT), ("_ftsx", 1)], dict(spec.get("weights") or {field: 1 for field, kind in key if kind == TEXT})
+    return key, None
+
+
+def same_index(existing, model):
+    spec = model.document
+    key, weights = index_key(spec)
+    return (list(existing["key"]) == key and existing.get("weights") == weights
+            and existing.get("unique", False) == spec.get("unique", False))
+
+
+def has_duplicates(collection, model):
+    # Documents a unique index would reject, missing fields count as null like in the index
+    group = {"_id": {f"k{i}": f"${field}" for i, field in enumerate(model.document["key"])}, "count": {"$sum": 1}}
+    return bool(list(collection.aggregate([{"$group": group}, {"$match": {"count": {"$gt": 1}}}, {"$limit": 1}], allowDiskUse=True)))
+
+
+def duplicate_warning(collection_name, model):
+    fix = DEDUPE_MIGRATIONS.get(collection_name)
+    hint = f", run python3 -m Mongodb.migrations {fix}" if fix else ""
+    print(f"WARNING: {collection_name}.{model.document['name']} not created, duplicate keys{hint}")
+
+
+def ensure_indexes(db):
+    """
+    Create the registry indexes. Safe to run on every startup: matching indexes
+    are left alone, an index whose name or keys match a registry entry with
+    different options is dropped and rebuilt, and retired indexes are dropped.
+    A unique index the existing documents violate is skipped with a warning
+    instead of stopping the startup, the index it would replace is kept.
+    """
+    for collection_name, models in INDEXES.items():
+        collection = db[collection_name]
+        existing = collection.index_information()
+        for name in RETIRED_INDEXES.get(collection_name, []):
+            if existing.pop(name, None):
+                collection.drop_index(name)
+                print(f"Dropped retired index {collection_name}.{name}")
+        to_create = []
+        for model in models:
+            spec = model.document
+            if spec["name"] in existing and same_index(existing[spec["name"]], model):
+                to_create.append(model)
+                continue
+            if spec.get("unique") and has_duplicates(collection, model):
+                duplicate_warning(collection_name, model)
+                continue
+            to_create.append(model)
+            for name, info in list(existing.items()):
+                if name == "_id_" or (name == spec["name"] and same_index(info, model)):
+                    continue
+                if name == spec["name"] or list(info["key"]) == index_key(spec)[0]:
+                    collection.drop_index(name)
+                    del existing[name]
+                    print(f"Dropped index {collection_name}.{name} to rebuild it as {spec['name']}")
+        if not to_create:
+            continue
+        try:
+            collection.create_indexes(to_create)
+        except OperationFailure as e:
+            if e.code != DUPLICATE_KEY:
+                raise
+            # Duplicates written since the check: the indexes of one createIndexes
+            # are built together, build the others one by one
+            for model in to_create:
+                try:
+                    collection.create_indexes([model])
+                except OperationFailure as e:
+                    if e.code != DUPLICATE_KEY:
+                        raise
+                    duplicate_warning(collection_name, model)
+
+    print("Indexes created successfully!")
+
+
+# QUERY PLAN CHECKS
+def plan_stages(plan):
+    # Stages of a winning plan tree (classic engine and slot based engine layouts)
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from plan_stages(child)
+
+
+def check_query_plans(db):
+    """Explain every route query shape and return the ones that scan the collection or sort in memory."""
+    problems = []
+    for route, collection_name, query, sort in QUERY_SHAPES:
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        stages = set(plan_stages(cursor.limit(50).explain()["queryPlanner"]["winningPlan"]))
+        flagged = sorted(stages & {"COLLSCAN", "SORT"})
+        status = "OK" if not flagged else "WARNING: " + ", ".join(flagged)
+        print(f"{route:45} {collection_name:18} {status}")
+        if flagged:
+            problems.append((route, flagged))
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create the MongoDB indexes and check the query plans of the routes")
+    parser.add_argument("--check", action="store_true", help="only explain the route queries, do not create indexes")
+    args = parser.parse_args()
+
+    mongodb_client = MongoClient(MONGODB_URI)
+    try:
+        db = mongodb_client[DB_NAME]
+        if not args.check:
+            ensure_indexes(db)
+        problems = check_query_plans(db)
+        print(f"{len(problems)} query shapes with a COLLSCAN or an in-memory SORT")
+    finally:
+        mongodb_client.close()
+    raise SystemExit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
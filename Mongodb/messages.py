@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+
+from .pagination import encode_cursor, decode_cursor
+
+# Ticket messages live in message_buckets, not in the ticket document, so a long
+# conversation never makes ticket reads and writes slower. A bucket holds at most
+# BUCKET_SIZE messages of one ticket sent within BUCKET_SPAN of its first one:
+#   {ticket_id, start, end, count, messages: [{sender_id, timestamp, message_text}]}
+BUCKET_SIZE = 100
+BUCKET_SPAN = timedelta(days=1)
+
+
+def message_time(message):
+    timestamp = message.get("timestamp")
+    if isinstance(timestamp, datetime):
+        return timestamp
+    try:
+        return datetime.fromisoformat(str(timestamp).replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return datetime.utcnow()
+
+
+def append_message(db, ticket_uuid, message):
+    """
+    Add the message to the open bucket of the ticket, or start a new bucket when
+    the last one is full or too old. One upsert, no read.
+    """
+    sent = message_time(message)
+    db.message_buckets.update_one(
+        {"ticket_id": ticket_uuid, "count": {"$lt": BUCKET_SIZE}, "start": {"$gte": sent - BUCKET_SPAN}},
+        {
+            "$push": {"messages": message},
+            "$inc": {"count": 1},
+            "$max": {"end": sent},
+            "$setOnInsert": {"start": sent},
+        },
+        upsert=True,
+    )
+
+
+def bucket_documents(ticket_uuid, messages, **extra):
+    # Buckets for a whole list of messages (new tickets, migration), same bounds as append_message
+    buckets = []
+    for message in sorted(messages, key=message_time):
+        sent = message_time(message)
+        if not buckets or buckets[-1]["count"] >= BUCKET_SIZE or sent - buckets[-1]["start"] > BUCKET_SPAN:
+            buckets.append(dict(extra, ticket_id=ticket_uuid, start=sent, end=sent, count=0, messages=[]))
+        bucket = buckets[-1]
+        bucket["messages"].append(message)
+        bucket["count"] += 1
+        bucket["end"] = sent
+    return buckets
+
+
+def take_messages(tickets):
+    # Embedded messages of ticket documents about to be inserted, emptied on the documents
+    messages = {}
+    for ticket in tickets:
+        messages[ticket["uuid"]] = ticket.get("messages") or []
+        ticket["messages"] = []
+    return messages
+
+
+def insert_buckets(db, messages, ticket_ids):
+    # Only for the tickets actually inserted, a duplicate ticket must not add its messages twice
+    buckets = [bucket for ticket_id in ticket_ids for bucket in bucket_documents(ticket_id, messages.get(ticket_id, []))]
+    if buckets:
+        db.message_buckets.insert_many(buckets, ordered=False)
+
+
+def decode_message_cursor(cursor):
+    # Cursors of other routes decode fine but are not [start, bucket id, position]
+    value = decode_cursor(cursor)
+    try:
+        start, bucket_id, position = value
+        if not isinstance(position, int):
+            raise ValueError(position)
+        return datetime.fromisoformat(start), ObjectId(bucket_id), position
+    except (TypeError, ValueError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def message_page(db, ticket_uuid, cursor=None, limit=50):
+    """
+    Messages of the ticket in sending order, one page at a time. The cursor is
+    the position (bucket start, bucket id, index in the bucket) of the last message.
+    """
+    pipeline = [{"$match": {"ticket_id": ticket_uuid}}]
+    if cursor:
+        start, bucket_id, position = decode_message_cursor(cursor)
+        pipeline[0]["$match"]["start"] = {"$gte": start}
+    pipeline += [
+        {"$sort": {"start": 1, "_id": 1}},
+        {"$unwind": {"path": "$messages", "includeArrayIndex": "position"}},
+    ]
+    if cursor:
+        pipeline.append({"$match": {"$or": [
+            {"start": {"$gt": start}},
+            {"start": start, "_id": {"$gt": bucket_id}},
+            {"_id": bucket_id, "position": {"$gt": position}},
+        ]}})
+    pipeline += [{"$limit": limit + 1}, {"$project": {"start": 1, "position": 1, "messages": 1}}]
+
+    rows = list(db.message_buckets.aggregate(pipeline))
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor([last["start"].isoformat(), str(last["_id"]), last["position"]])
+    return {"items": [row["messages"] for row in rows[:limit]], "next_cursor": next_cursor}
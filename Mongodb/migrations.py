@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import time
+
+from pymongo import MongoClient
+
+from .modelmongo import PRIORITY_RANKS, DEFAULT_PRIORITY_RANK
+from .messages import bucket_documents
+from .reports import build_daily_reports
+
+MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017')
+DB_NAME = os.getenv('MONGODB_DB_NAME', 'final_project')
+
+MIGRATION_CHUNK_SIZE = int(os.getenv('MIGRATION_CHUNK_SIZE', '1000'))
+
+# Every migrated document gets a new version so cached ETags stop matching
+NEXT_VERSION = {"$add": [{"$ifNull": ["$version", 0]}, 1]}
+
+
+# BACKFILLS: safe to run again, every document ends with the same values
+def backfill_assignees(db):
+    """
+    Copy agent_id and assigned_timestamp of the latest assignment of every ticket
+    onto the ticket, server side with a single $merge.
+    """
+    db.agent_assignments.aggregate([
+        {"$sort": {"assigned_timestamp": 1}},
+        {"$group": {
+            "_id": "$ticket_id",
+            "agent_id": {"$last": "$agent_id"},
+            "assigned_timestamp": {"$last": "$assigned_timestamp"},
+        }},
+        {"$project": {"_id": 0, "uuid": "$_id", "agent_id": 1, "assigned_timestamp": 1}},
+        # Merges on the unique uuid index of tickets, assignments of deleted tickets are dropped
+        {"$merge": {"into": "tickets", "on": "uuid", "whenMatched": [{"$set": {
+            "agent_id": "$$new.agent_id",
+            "assigned_timestamp": "$$new.assigned_timestamp",
+            "version": NEXT_VERSION,
+        }}], "whenNotMatched": "discard"}},
+    ], allowDiskUse=True)
+    return db.tickets.count_documents({"agent_id": {"$ne": None}})
+
+
+def backfill_priority_ranks(db):
+    # Pipeline update: the rank is computed by the server, no document is read by the client
+    branches = [{"case": {"$eq": ["$priority", priority]}, "then": rank} for priority, rank in PRIORITY_RANKS.items()]
+    # Only tickets whose rank is missing or stale, a rerun changes no version
+    stale = [{"priority": priority, "priority_rank": {"$ne": rank}} for priority, rank in PRIORITY_RANKS.items()]
+    stale.append({"priority": {"$nin": list(PRIORITY_RANKS)}, "priority_rank": {"$ne": DEFAULT_PRIORITY_RANK}})
+    result = db.tickets.update_many({"$or": stale}, [{"$set": {
+        "priority_rank": {"$switch": {"branches": branches, "default": DEFAULT_PRIORITY_RANK}},
+        "version": NEXT_VERSION,
+    }}])
+    return result.modified_count
+
+
+# ISO strings written by older versions, converted to BSON dates
+DATE_FIELDS = {
+    "tickets": ["created_timestamp", "updated_timestamp", "assigned_timestamp"],
+    "agent_assignments": ["assigned_timestamp"],
+    "daily_reports": ["report_date"],
+}
+VERSIONED_COLLECTIONS = {"tickets", "daily_reports"}
+
+
+def convert_dates(db):
+    """
+    Convert the DATE_FIELDS still stored as strings with one pipeline update per
+    collection. Strings the server cannot parse are left as they are and counted.
+    """
+    converted = 0
+    for collection, fields in DATE_FIELDS.items():
+        converted_fields = {
+            field: {"$cond": [
+                {"$eq": [{"$type": f"${field}"}, "string"]},
+                {"$dateFromString": {"dateString": f"${field}", "onError": f"${field}"}},
+                f"${field}",
+            ]}
+            for field in fields
+        }
+        if collection in VERSIONED_COLLECTIONS:
+            converted_fields["version"] = NEXT_VERSION
+        query = {"$or": [{field: {"$type": "string"}} for field in fields]}
+        converted += db[collection].update_many(query, [{"$set": converted_fields}]).modified_count
+
+        left = db[collection].count_documents(query)
+        if left:
+            print(f"{collection}: {left} documents with dates that could not be parsed")
+    return converted
+
+
+# MOVES
+def move_messages_to_buckets(db):
+    """
+    Move the messages embedded in tickets to message_buckets, a chunk of tickets
+    at a time. Buckets of a ticket are marked migrated, so a run that stopped
+    half way replaces them instead of duplicating the messages.
+    """
+    moved = 0
+    query = {"messages.0": {"$exists": True}}
+    while True:
+        tickets = list(db.tickets.find(query, {"_id": 0, "uuid": 1, "messages": 1}).limit(MIGRATION_CHUNK_SIZE))
+        if not tickets:
+            return moved
+        ticket_ids = [ticket["uuid"] for ticket in tickets]
+        db.message_buckets.delete_many({"ticket_id": {"$in": ticket_ids}, "migrated": True})
+        buckets = [bucket for ticket in tickets for bucket in bucket_documents(ticket["uuid"], ticket["messages"], migrated=True)]
+        if buckets:
+            db.message_buckets.insert_many(buckets, ordered=False)
+        db.tickets.update_many({"uuid": {"$in": ticket_ids}}, {"$set": {"messages": []}, "$inc": {"version": 1}})
+        moved += len(tickets)
+
+
+# DEDUPLICATION
+def dedupe_daily_reports(db):
+    """
+    Keep one daily report per report_date, the one with the highest version,
+    so the unique report_date_index can be built. Returns the reports deleted.
+    """
+    duplicates = db.daily_reports.aggregate([
+        {"$sort": {"version": -1, "_id": -1}},
+        {"$group": {"_id": "$report_date", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ], allowDiskUse=True)
+    extra_ids = [report_id for duplicate in duplicates for report_id in duplicate["ids"][1:]]
+    if not extra_ids:
+        return 0
+    return db.daily_reports.delete_many({"_id": {"$in": extra_ids}}).deleted_count
+
+
+# ROLLUPS
+def build_rollups(db):
+    # Count every day between the first and the last ticket, reads the ends of created_uuid_index
+    first = db.tickets.find_one({}, {"_id": 0, "created_timestamp": 1}, sort=[("created_timestamp", 1)])
+    last = db.tickets.find_one({}, {"_id": 0, "created_timestamp": 1}, sort=[("created_timestamp", -1)])
+    if not first:
+        return 0
+    return len(build_daily_reports(db, first["created_timestamp"].date(), last["created_timestamp"].date()))
+
+
+MIGRATIONS = {
+    "assignees": backfill_assignees,
+    "priority_ranks": backfill_priority_ranks,
+    "message_buckets": move_messages_to_buckets,
+    "dates": convert_dates,
+    "daily_reports": dedupe_daily_reports,
+    "rollups": build_rollups,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill denormalized fields and move data of the MongoDB collections")
+    parser.add_argument("migrations", nargs="+", choices=MIGRATIONS.keys())
+    args = parser.parse_args()
+
+    mongodb_client = MongoClient(MONGODB_URI)
+    try:
+        db = mongodb_client[DB_NAME]
+        for name in args.migrations:
+            start = time.perf_counter()
+            count = MIGRATIONS[name](db)
+            print(f"Migration {name}: {count} documents in {time.perf_counter() - start:.2f}s")
+    finally:
+        mongodb_client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,17 @@
 #!/usr/bin/env python3
 import uuid
-from typing import Optional, List
-from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Optional, List, Union
+from pydantic import BaseModel, Field, model_validator
 from typing import List, Dict, Any
 
+# Sort key of the priorities, stored on tickets as priority_rank (unknown priorities sort last)
+PRIORITY_RANKS = {"high": 1, "medium": 2, "low": 3}
+DEFAULT_PRIORITY_RANK = 4
+
+def priority_rank(priority):
+    return PRIORITY_RANKS.get(priority, DEFAULT_PRIORITY_RANK)
+
 class User(BaseModel):
     uuid: str = Field(...)
     username: str = Field(...)
@@ -64,10 +72,10 @@ class Ticket(BaseModel):
     description: str = Field(...)
     status: str = Field(...)  # e.g., "open", "closed"
     priority: str = Field(...)  # e.g., "low", "medium", "high", "urgent"
-    created_timestamp: str = Field(...)
-    updated_timestamp: str = Field(...)
+    created_timestamp: datetime = Field(...)  # stored as BSON dates
+    updated_timestamp: datetime = Field(...)
     category: str = Field(...)  # e.g., "technical", "billing"
-    messages: list = Field([])  # List of messages within the ticket
+    messages: List[dict] = Field([])  # List of messages within the ticket, stored in message_buckets
     feedback: dict = Field({
         "rating": None,
         "comments": None,
@@ -75,6 +83,15 @@ class Ticket(BaseModel):
     })
     resolution_steps: list = Field([])  # list of completed steps
     channel: str = Field(...)  # e.g., "email", "phone", "chat"
+    agent_id: Optional[str] = None  # copied from the latest agent assignment
+    assigned_timestamp: Optional[datetime] = None
+    priority_rank: Optional[int] = None  # always derived from priority
+    version: int = Field(0)  # incremented by every write, used for ETags
+
+    @model_validator(mode="after")
+    def set_priority_rank(self):
+        self.priority_rank = priority_rank(self.priority)
+        return self
 
     class Config:
         populate_by_name = True
@@ -101,7 +118,9 @@ class Ticket(BaseModel):
                     "submitted_timestamp": "2024-11-14T12:00:00Z"
                 },
                 "resolution_steps": ["Reset password link sent"],
-                "channel": "chat"
+                "channel": "chat",
+                "agent_id": "1_",
+                "assigned_timestamp": "2024-11-13T10:02:00Z"
             }
         }
 
@@ -110,6 +129,28 @@ class UpdateTicket(BaseModel):
     status: Optional[str]  
     priority: Optional[str] 
 
+class BulkTicketUpdate(BaseModel):
+    ticket_id: str
+    status: Optional[str] = None
+    priority: Optional[str] = None
+
+class BulkUpdateResult(BaseModel):
+    ticket_id: str
+    result: str  # "updated", "not_found", "invalid" or "failed"
+    cassandra: Optional[str] = None  # "updated" or the error, None when not propagated
+    dgraph: Optional[str] = None
+    error: Optional[str] = None
+
+BATCH_GET_MAX_IDS = 1000
+
+class BatchGetRequest(BaseModel):
+    ids: List[str] = Field(..., max_length=BATCH_GET_MAX_IDS)
+    fields: Optional[List[str]] = None  # every field when None
+
+class BatchGetResponse(BaseModel):
+    results: Dict[str, Optional[Dict[str, Any]]]  # null for the ids that do not exist
+    not_found: List[str]
+
 class UpdateResolutionSteps(BaseModel):
     steps: List[str]
 
@@ -117,7 +158,7 @@ class AgentAssignment(BaseModel):
     uuid: str = Field(...)
     agent_id: str = Field(...) 
     ticket_id: str = Field(...)  
-    assigned_timestamp: str = Field(...)
+    assigned_timestamp: datetime = Field(...)
     priority_level: str = Field(...)
 
     class Config:
@@ -134,13 +175,16 @@ class AgentAssignment(BaseModel):
 
 class DailyReport(BaseModel):
     uuid: str = Field(...)
-    report_date: str = Field(...)
+    report_date: datetime = Field(...)  # midnight of the day
     ticket_count: int = Field(...)
     channel_stats: dict = Field({
         "email": 0,
         "phone": 0,
         "chat": 0
     })
+    status_stats: dict = Field({})  # e.g., {"open": 10, "resolved": 80}
+    priority_stats: dict = Field({})  # e.g., {"high": 20, "low": 35}
+    version: int = Field(0)  # incremented every time the report is rebuilt, used for ETags
 
     class Config:
         populate_by_name = True
@@ -153,7 +197,82 @@ class DailyReport(BaseModel):
                     "email": 40,
                     "phone": 30,
                     "chat": 30
+                },
+                "status_stats": {
+                    "open": 10,
+                    "in_progress": 10,
+                    "resolved": 80
+                },
+                "priority_stats": {
+                    "high": 20,
+                    "medium": 45,
+                    "low": 35
                 }
             }
         }
 
+
+# PAGES RETURNED BY THE LISTING ROUTES (next_cursor is None on the last page)
+class UserSummary(BaseModel):
+    uuid: str = Field(...)
+    username: str = Field(...)
+
+class UserPage(BaseModel):
+    items: List[User]
+    next_cursor: Optional[str] = None
+
+class UserSummaryPage(BaseModel):
+    items: List[UserSummary]
+    next_cursor: Optional[str] = None
+
+# Ticket as returned by the read routes: only the projected fields are set, and
+# the routes serialize it with response_model_exclude_unset so the others are left out
+class TicketView(BaseModel):
+    uuid: str
+    customer_id: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[str] = None
+    priority: Optional[str] = None
+    created_timestamp: Optional[datetime] = None
+    updated_timestamp: Optional[datetime] = None
+    category: Optional[str] = None
+    channel: Optional[str] = None
+    feedback: Optional[dict] = None
+    resolution_steps: Optional[list] = None
+    agent_id: Optional[str] = None
+    assigned_timestamp: Optional[datetime] = None
+    priority_rank: Optional[int] = None
+    version: Optional[int] = None
+
+class TicketPage(BaseModel):
+    items: List[TicketView]
+    next_cursor: Optional[str] = None
+
+class TicketSearchResult(TicketView):
+    score: float  # text relevance, higher first
+
+class TicketSearchPage(BaseModel):
+    items: List[TicketSearchResult]
+    next_cursor: Optional[str] = None
+
+# Messages are returned as they were stored: older tickets and imports may miss
+# a field, use other types or carry extra fields
+class Message(BaseModel):
+    sender_id: Optional[Union[str, int]] = None
+    timestamp: Optional[Union[datetime, str]] = None
+    message_text: Optional[str] = None
+
+    class Config:
+        extra = "allow"
+
+class MessagePage(BaseModel):
+    items: List[Message]
+    next_cursor: Optional[str] = None
+
+class AgentAssignmentPage(BaseModel):
+    items: List[AgentAssignment]
+    next_cursor: Optional[str] = None
+
+class DailyReportPage(BaseModel):
+    items: List[DailyReport]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, Query
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+# Reusable query parameters for every paginated route
+LimitQuery = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT, description=f"Page size (max {MAX_LIMIT})")
+CursorQuery = Query(None, description="next_cursor of the previous page")
+CreatedFromQuery = Query(None, description="Only tickets created at or after this time")
+CreatedToQuery = Query(None, description="Only tickets created before this time")
+
+# Key of the pages filtered on a created_timestamp window: the range and the
+# order both come from the same (..., created_timestamp, uuid) index
+CREATED_KEY = ("created_timestamp", "uuid")
+
+
+def cursor_default(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"{type(value).__name__} is not a cursor value")
+
+
+def cursor_object(value):
+    return datetime.fromisoformat(value["$date"]) if value.keys() == {"$date"} else value
+
+
+def encode_cursor(value):
+    # Opaque to clients: base64 of the last key of the page
+    return base64.urlsafe_b64encode(json.dumps(value, default=cursor_default).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()), object_hook=cursor_object)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def created_range(query, created_from=None, created_to=None):
+    # [created_from, created_to) window on created_timestamp added to the query
+    window = {}
+    if created_from:
+        window["$gte"] = created_from
+    if created_to:
+        window["$lt"] = created_to
+    return dict(query, created_timestamp=window) if window else query
+
+
+def after(key, values):
+    # Documents after the last one of the previous page in (key[0], key[1]...) order
+    if isinstance(key, str):
+        return {key: {"$gt": values}}
+    if not isinstance(values, list) or len(values) != len(key):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"$or": [
+        dict(zip(key[:i], values[:i]), **{key[i]: {"$gt": values[i]}})
+        for i in range(len(key))
+    ]}
+
+
+def paginate(collection, query, projection, cursor=None, limit=DEFAULT_LIMIT, key="uuid"):
+    """
+    Keyset pagination: documents sorted by `key` (a field or a tuple of fields),
+    starting after the cursor. One extra document is read to know whether there
+    is a next page.
+    """
+    fields = (key,) if isinstance(key, str) else key
+    # The next cursor is built from the key fields, they are always read but
+    # the ones the projection leaves out are removed from the returned items
+    if any(value and field != "_id" for field, value in projection.items()):
+        hidden = [field for field in fields if not projection.get(field)]
+        projection = dict(projection, **{field: 1 for field in fields})
+    else:
+        hidden = [field for field in fields if field in projection]
+        projection = {field: value for field, value in projection.items() if field not in fields}
+    if cursor:
+        query = {"$and": [query, after(key, decode_cursor(cursor))]}
+
+    documents = list(collection.find(query, projection).sort([(field, 1) for field in fields]).limit(limit + 1))
+    next_cursor = None
+    if len(documents) > limit:
+        last = documents[limit - 1]
+        next_cursor = encode_cursor(last[key] if isinstance(key, str) else [last[field] for field in key])
+    for document in documents:
+        for field in hidden:
+            document.pop(field, None)
+    return {"items": documents[:limit], "next_cursor": next_cursor}
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+import uuid
+from collections import Counter
+from datetime import date, datetime, time, timedelta, timezone
+
+from pymongo import UpdateOne
+
+# ROLLUPS: one ticket_rollups document per day x channel x status x priority,
+#   {day, channel, status, priority, count, version}
+# kept up to date with $inc by every ticket write of the API, so a daily report
+# reads a handful of rollups instead of the tickets of the day.
+ROLLUP_FIELDS = ("channel", "status", "priority")
+STATS_FIELDS = {"channel": "channel_stats", "status": "status_stats", "priority": "priority_stats"}
+REPORT_RANGE_MAX_DAYS = 1000
+
+
+def report_uuid(day):
+    # One report per day: the uuid is derived from the date so rebuilding it keeps the same id
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"daily_report/{day.isoformat()}"))
+
+
+def day_start(day):
+    # report_date and the ticket timestamps are BSON dates, a day starts at midnight
+    return datetime.combine(day, time.min)
+
+
+def empty_report(day):
+    return {
+        "uuid": report_uuid(day),
+        "report_date": day_start(day),
+        "ticket_count": 0,
+        "channel_stats": {},
+        "status_stats": {},
+        "priority_stats": {},
+        "version": 0,
+    }
+
+
+def created_day(ticket):
+    created = ticket["created_timestamp"]
+    if isinstance(created, str):
+        created = datetime.fromisoformat(created)
+    if created.tzinfo:
+        created = created.astimezone(timezone.utc).replace(tzinfo=None)
+    return day_start(created.date())
+
+
+def rollup_key(ticket):
+    return (created_day(ticket),) + tuple(ticket.get(field) for field in ROLLUP_FIELDS)
+
+
+def update_rollups(db, counts):
+    # counts: {rollup key: change}, one upsert per rollup that changes
+    operations = [
+        UpdateOne(
+            dict(zip(("day",) + ROLLUP_FIELDS, key)),
+            {"$inc": {"count": change, "version": 1}},
+            upsert=True,
+        )
+        for key, change in counts.items() if change
+    ]
+    if operations:
+        db.ticket_rollups.bulk_write(operations, ordered=False)
+
+
+def count_created(db, tickets):
+    update_rollups(db, Counter(rollup_key(ticket) for ticket in tickets))
+
+
+def count_deleted(db, tickets):
+    counts = Counter()
+    counts.subtract(rollup_key(ticket) for ticket in tickets)
+    update_rollups(db, counts)
+
+
+def count_moved(db, changes):
+    # changes: (ticket before, ticket after) of status/priority updates
+    counts = Counter()
+    for before, after in changes:
+        counts[rollup_key(before)] -= 1
+        counts[rollup_key(after)] += 1
+    update_rollups(db, counts)
+
+
+def fold(reports, rollups):
+    for rollup in rollups:
+        report = reports[rollup["day"].date()]
+        report["ticket_count"] += rollup["count"]
+        report["version"] += rollup.get("version", 1)
+        for field, stats in STATS_FIELDS.items():
+            if rollup["count"]:
+                report[stats][rollup[field]] = report[stats].get(rollup[field], 0) + rollup["count"]
+    return reports
+
+
+def daily_reports(db, start_date, end_date):
+    """
+    Reports of every day in [start_date, end_date] folded from the rollups,
+    days without tickets included. The version of a report is the sum of the
+    versions of its rollups, so it changes with every write that touches the day.
+    """
+    reports = {}
+    day = start_date
+    while day <= end_date:
+        reports[day] = empty_report(day)
+        day += timedelta(days=1)
+
+    rollups = db.ticket_rollups.find(
+        {"day": {"$gte": day_start(start_date), "$lte": day_start(end_date)}},
+        {"_id": 0},
+    )
+    return list(fold(reports, rollups).values())
+
+
+def build_daily_reports(db, start_date, end_date):
+    """
+    Recount the rollups of every day in [start_date, end_date] from the tickets
+    with a single $group (after a bulk load, or to repair drifted counts), store
+    the reports in daily_reports and return them.
+    """
+    end_exclusive = end_date + timedelta(days=1)
+    pipeline = [
+        {"$match": {"created_timestamp": {"$gte": day_start(start_date), "$lt": day_start(end_exclusive)}}},
+        {"$group": {
+            "_id": {
+                "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_timestamp"}},
+                "channel": "$channel",
+                "status": "$status",
+                "priority": "$priority",
+            },
+            "count": {"$sum": 1},
+        }},
+    ]
+    groups = {
+        (day_start(date.fromisoformat(group["_id"]["day"])),) + tuple(group["_id"][field] for field in ROLLUP_FIELDS): group["count"]
+        for group in db.tickets.aggregate(pipeline)
+    }
+
+    # Rollups of the range that no ticket matches any more go back to 0
+    day_range = {"day": {"$gte": day_start(start_date), "$lt": day_start(end_exclusive)}}
+    db.ticket_rollups.update_many(dict(day_range, count={"$ne": 0}), {"$set": {"count": 0}, "$inc": {"version": 1}})
+    if groups:
+        db.ticket_rollups.bulk_write([
+            UpdateOne(dict(zip(("day",) + ROLLUP_FIELDS, key)), {"$set": {"count": count}, "$inc": {"version": 1}}, upsert=True)
+            for key, count in groups.items()
+        ], ordered=False)
+
+    reports = daily_reports(db, start_date, end_date)
+    db.daily_reports.bulk_write([
+        UpdateOne(
+            {"report_date": report["report_date"]},
+            {"$set": {k: v for k, v in report.items() if k not in ("uuid", "version")}, "$setOnInsert": {"uuid": report["uuid"]}, "$inc": {"version": 1}},
+            upsert=True,
+        )
+        for report in reports
+    ], ordered=False)
+    return reports
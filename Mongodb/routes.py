@@ -1,97 +1,174 @@
 #!/usr/bin/env python3
-from fastapi import APIRouter, Body, Request, Response, HTTPException, status, Query, Body
+import os
+from fastapi import APIRouter, Body, Depends, Request, Response, HTTPException, status, Query, Body
 from fastapi.encoders import jsonable_encoder
 from typing import List
 from pydantic import BaseModel
 from pymongo import MongoClient
 from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
 from pymongo.collection import Collection
 import requests
 from typing import List, Dict, Any
-from datetime import datetime
-
-
-from .modelmongo import User, Ticket, AgentAssignment, DailyReport, UpdateUser, UpdateTicket, UpdateResolutionSteps
+from datetime import datetime, date
+
+
+from . import cache as response_cache
+from . import bulkupdate, reports, search
+from . import fields as ticket_fields
+from . import assignments as assignments_index
+from . import messages as ticket_messages
+from .modelmongo import User, Ticket, TicketView, AgentAssignment, DailyReport, UpdateUser, UpdateTicket, UpdateResolutionSteps
+from .modelmongo import priority_rank, BulkTicketUpdate, BulkUpdateResult, BatchGetRequest, BatchGetResponse
+from .modelmongo import UserPage, UserSummaryPage, TicketPage, AgentAssignmentPage, DailyReportPage, MessagePage, TicketSearchPage
+from .pagination import paginate, created_range, LimitQuery, CursorQuery, CreatedFromQuery, CreatedToQuery, CREATED_KEY
+from .streaming import wants_ndjson, ndjson_response
+from .etags import conditional, document_etag, list_etag
+from .fields import FieldsQuery
 from typing import Dict, Optional
 
 router = APIRouter()
 
 # MongoDB conection
-client = MongoClient("mongodb://localhost:27017/")
+# pymongo is blocking, so every route is a plain `def`: FastAPI runs them in its
+# thread pool (sized in main.py) instead of blocking the event loop. The
+# connection pool is sized to match so threads do not wait for a socket.
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+client = MongoClient("mongodb://localhost:27017/", maxPoolSize=MONGODB_MAX_POOL_SIZE)
 db = client["final_project"]
 
+
+# Ticket ids assigned to the agent_id of the request, served from the cached assignment index
+def agent_tickets(agent_id: str) -> frozenset:
+    ticket_ids = assignments_index.agent_ticket_ids(db, agent_id)
+    if not ticket_ids:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return ticket_ids
+
+
+# Page of tickets, in created_timestamp order instead of uuid order when a time window is given
+def ticket_page(query, projection, cursor, limit, created_from=None, created_to=None):
+    if created_from or created_to:
+        return paginate(db.tickets, created_range(query, created_from, created_to), projection, cursor, limit, CREATED_KEY)
+    return paginate(db.tickets, query, projection, cursor, limit)
+
 # DATA INSERT TO UVICORN:
 @router.post("/users/")
-async def create_users(users: List[User]):
+def create_users(users: List[User]):
     db.users.insert_many([user.model_dump(by_alias=True) for user in users])
+    response_cache.invalidate("users")
     return {"message": "Users added successfully"}
 
+def tickets_written(documents, messages):
+    # Buckets, rollups and cache of the tickets insert_many actually wrote
+    ticket_messages.insert_buckets(db, messages, [document["uuid"] for document in documents])
+    reports.count_created(db, documents)
+    response_cache.invalidate("tickets", "tickets:summary", "daily_reports", *{f"customer:{document['customer_id']}" for document in documents})
+
+
 @router.post("/tickets/")
-async def create_tickets(tickets: List[Ticket]):
-    db.tickets.insert_many([ticket.model_dump(by_alias=True) for ticket in tickets])
+def create_tickets(tickets: List[Ticket]):
+    documents = [ticket.model_dump(by_alias=True) for ticket in tickets]
+    messages = ticket_messages.take_messages(documents)
+    try:
+        db.tickets.insert_many(documents)
+    except BulkWriteError as e:
+        # Ordered insert: the tickets before the failing one were written
+        tickets_written(documents[:e.details["nInserted"]], messages)
+        raise
+    tickets_written(documents, messages)
     return {"message": "Tickets added successfully"}
 
 @router.post("/AgentAssignments/")
-async def create_assignments(assignments: List[AgentAssignment]):
-    db.agent_assignments.insert_many([assignment.model_dump(by_alias=True) for assignment in assignments])
+def create_assignments(assignments: List[AgentAssignment]):
+    documents = [assignment.model_dump(by_alias=True) for assignment in assignments]
+    db.agent_assignments.insert_many([dict(document) for document in documents])
+    assignments_index.set_ticket_assignees(db, documents)
+    assignments_index.invalidate({assignment.agent_id for assignment in assignments})
+    # agent_id is copied onto the tickets, so their listings change too
+    customer_ids = db.tickets.distinct("customer_id", {"uuid": {"$in": [assignment.ticket_id for assignment in assignments]}})
+    response_cache.invalidate("tickets", "tickets:summary", *(f"customer:{customer_id}" for customer_id in customer_ids))
     return {"message": "Agent assignments added successfully"}
 
 @router.post("/dailyReports/")
-async def create_daily_reports(reports: List[DailyReport]):
+def create_daily_reports(reports: List[DailyReport]):
     db.daily_reports.insert_many([report.model_dump(by_alias=True) for report in reports])
+    response_cache.invalidate("daily_reports")
     return {"message": "Daily reports added successfully"} 
 
 
 
-# Showing all collections
-@router.get("/users/", response_model=List[User])
-async def get_users():
-    users = list(db.users.find({}, {"_id": 0})) 
-    return users
+# Showing all collections (one page at a time, follow next_cursor for the rest)
+@router.get("/users/", response_model=UserPage)
+def get_users(limit: int = LimitQuery, cursor: Optional[str] = CursorQuery):
+    return paginate(db.users, {}, {"_id": 0}, cursor, limit)
 
-@router.get("/users", response_description="Get all users (ID and Name)")
-async def get_all_users():
-    users = db.users.find({}, {"uuid": 1, "username": 1})  # Project only _id and name
-    user_list = [{"uuid": user["uuid"], "username": user["username"]} for user in users]
-    if not user_list:
+@router.get("/users", response_description="Get all users (ID and Name)", response_model=UserSummaryPage)
+def get_all_users(limit: int = LimitQuery, cursor: Optional[str] = CursorQuery):
+    page = paginate(db.users, {}, {"_id": 0, "uuid": 1, "username": 1}, cursor, limit)  # Project only id and name
+    if not page["items"] and not cursor:
         raise HTTPException(status_code=404, detail="No users found.")
-    return user_list
+    return page
 
 
-@router.get("/users/customers", response_description="Get all customers (ID and Name)")
-async def get_all_customers():
-    customers = db.users.find({"role": "customer"}, {"uuid": 1, "username": 1})  # Filter by role and project only _id and name
-    customer_list = [{"uuid": customer["uuid"], "username": customer["username"]} for customer in customers]
-    if not customer_list:
+@router.get("/users/customers", response_description="Get all customers (ID and Name)", response_model=UserSummaryPage)
+def get_all_customers(limit: int = LimitQuery, cursor: Optional[str] = CursorQuery):
+    page = response_cache.cached("/users/customers", {"limit": limit, "cursor": cursor}, ["users"],
+                                 lambda: paginate(db.users, {"role": "customer"}, {"_id": 0, "uuid": 1, "username": 1}, cursor, limit))  # Filter by role and project only id and name
+    if not page["items"] and not cursor:
         raise HTTPException(status_code=404, detail="No customers found.")
-    return customer_list
+    return page
 
 
-@router.get("/tickets/", response_model=List[Ticket])
-async def get_tickets():
-    tickets = list(db.tickets.find({}, {"_id": 0}))  
-    return tickets
+@router.get("/tickets/", response_model=TicketPage, response_model_exclude_unset=True)
+def get_tickets(limit: int = LimitQuery, cursor: Optional[str] = CursorQuery,
+                created_from: Optional[datetime] = CreatedFromQuery, created_to: Optional[datetime] = CreatedToQuery, fields: Optional[str] = FieldsQuery):
+    projection = ticket_fields.projection(fields, ticket_fields.TICKET_FIELDS, {"_id": 0, "messages": 0})
+    return ticket_page({}, projection, cursor, limit, created_from, created_to)
 
-@router.get("/dailyReports/", response_model=List[DailyReport])
-async def get_daily_Reports():
-    daily_reports = list(db.daily_reports.find({}, {"_id": 0}))  
-    return daily_reports
+@router.get("/dailyReports/", response_model=DailyReportPage)
+def get_daily_Reports(limit: int = LimitQuery, cursor: Optional[str] = CursorQuery):
+    return paginate(db.daily_reports, {}, {"_id": 0}, cursor, limit)
     
-@router.get("/AgentAssignments/", response_model=List[AgentAssignment])
-async def get_Agent_Assignments():
-    agent_assignments = list(db.agent_assignments.find({}, {"_id": 0})) 
-    return agent_assignments
+@router.get("/AgentAssignments/", response_model=AgentAssignmentPage)
+def get_Agent_Assignments(limit: int = LimitQuery, cursor: Optional[str] = CursorQuery):
+    return paginate(db.agent_assignments, {}, {"_id": 0}, cursor, limit)
+
+# MULTI-GET: many documents by uuid in one $in query
+def batch_get(collection, model, request):
+    if request.fields is not None:
+        unknown = set(request.fields) - model.model_fields.keys()
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        projection = dict.fromkeys(request.fields, 1) | {"_id": 0, "uuid": 1}
+    else:
+        projection = {"_id": 0}
+
+    ids = list(dict.fromkeys(request.ids))
+    found = {document["uuid"]: document for document in collection.find({"uuid": {"$in": ids}}, projection)}
+    return {
+        "results": {uuid: found.get(uuid) for uuid in ids},
+        "not_found": [uuid for uuid in ids if uuid not in found],
+    }
+
+@router.post("/tickets/batch_get", response_model=BatchGetResponse)
+def batch_get_tickets(request: BatchGetRequest):
+    return batch_get(db.tickets, Ticket, request)
+
+@router.post("/users/batch_get", response_model=BatchGetResponse)
+def batch_get_users(request: BatchGetRequest):
+    return batch_get(db.users, User, request)
 
 # Search by Id in users
 @router.get("/users/{id}", response_description="Get a user by ID", response_model=List[User])
-async def get_users_id(id: str, request: Request):
+def get_users_id(id: str, request: Request):
     if (user := list(db.users.find({"uuid": id}))) is not None:
         return user
 
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User with ID {id} not found")
 
 @router.get("/users/customers/{id}", response_description="Get a customer by ID", response_model=List[User])
-async def get_customer_by_id(id: str, request: Request):
+def get_customer_by_id(id: str, request: Request):
     if (user := list(db.users.find({"uuid": id, "role": "customer"}))) is not None:
         return user
 
@@ -101,189 +178,170 @@ async def get_customer_by_id(id: str, request: Request):
 
 
 # ROUTES FOR FILTER IN TICKETS (agents)
-@router.get("/tickets/customerID/{customer_id}", response_description="Get Ticket by customer ID", response_model=List[Ticket])
-async def get_tickets_custID(customer_id: str, agent_id: str, request: Request):
-    agents = list(db.agent_assignments.find({"agent_id": agent_id}))
-    if not agents:
-        raise HTTPException(status_code=404, detail="Agent not found")
-
-    ticket_ids = [assignment.get("ticket_id") for assignment in agents]
-    if not ticket_ids:
-        return {"message": "No tickets assigned to this agent"}
-
-    tickets = list(db.tickets.find({"customer_id": customer_id, "uuid": {"$in": ticket_ids}}, {"_id": 0, "messages":0, "created_timestamp": 0}))
-    if not tickets:
+@router.get("/tickets/customerID/{customer_id}", response_description="Get Ticket by customer ID", response_model=TicketPage, response_model_exclude_unset=True)
+def get_tickets_custID(customer_id: str, agent_id: str, request: Request, limit: int = LimitQuery, cursor: Optional[str] = CursorQuery,
+                       ticket_ids: frozenset = Depends(agent_tickets), fields: Optional[str] = FieldsQuery):
+    projection = ticket_fields.projection(fields, ticket_fields.TICKET_FIELDS, {"_id": 0, "messages": 0})
+    page = paginate(db.tickets, {"customer_id": customer_id, "uuid": {"$in": list(ticket_ids)}}, projection, cursor, limit)
+    if not page["items"] and not cursor:
         raise HTTPException(status_code=404, detail=f"No tickets found for Customer ID: {customer_id} assigned to Agent {agent_id}.")
 
-    return tickets
-
-@router.get("/tickets/status/{status}", response_description="Get a ticket by their Status", response_model=List[Ticket])
-async def get_tickets_status(status: str, agent_id: str, request: Request):
-    # Find agent assignments
-    agents = list(db.agent_assignments.find({"agent_id": agent_id}))
-    if not agents:
-        raise HTTPException(status_code=404, detail="Agent not found")
+    return page
 
-    # Extract ticket IDs assigned to the agent
-    ticket_ids = [assignment.get("ticket_id") for assignment in agents]
-    if not ticket_ids:
-        return {"message": "No tickets assigned to this agent"}
-
-    # Find tickets by status and agent assignment
-    tickets = list(db.tickets.find({"status": status, "uuid": {"$in": ticket_ids}}, {"_id": 0, "messages": 0, "created_timestamp": 0}))
-    if not tickets:
+@router.get("/tickets/status/{status}", response_description="Get a ticket by their Status", response_model=TicketPage, response_model_exclude_unset=True)
+def get_tickets_status(status: str, agent_id: str, request: Request, limit: int = LimitQuery, cursor: Optional[str] = CursorQuery,
+                       ticket_ids: frozenset = Depends(agent_tickets), fields: Optional[str] = FieldsQuery):
+    projection = ticket_fields.projection(fields, ticket_fields.TICKET_FIELDS, {"_id": 0, "messages": 0})
+    # Find tickets by status among the ones assigned to the agent
+    page = paginate(db.tickets, {"status": status, "uuid": {"$in": list(ticket_ids)}}, projection, cursor, limit)
+    if not page["items"] and not cursor:
         raise HTTPException(status_code=404, detail=f"No tickets found with status: {status} assigned to Agent {agent_id}.")
 
-    return tickets
-
+    return page
 
-@router.get("/tickets/priority/{priority}", response_description="Get a ticket by their priority", response_model=List[Ticket])
-async def get_tickets_priority(priority: str, agent_id: str, request: Request):
-    agents = list(db.agent_assignments.find({"agent_id": agent_id}))
-    if not agents:
-        raise HTTPException(status_code=404, detail="Agent not found")
-
-    ticket_ids = [assignment.get("ticket_id") for assignment in agents]
-    if not ticket_ids:
-        return {"message": "No tickets assigned to this agent"}
 
-    tickets = list(db.tickets.find({"priority": priority, "uuid": {"$in": ticket_ids}}, {"_id": 0, "messages":0, "created_timestamp": 0}))
-    if not tickets:
+@router.get("/tickets/priority/{priority}", response_description="Get a ticket by their priority", response_model=TicketPage, response_model_exclude_unset=True)
+def get_tickets_priority(priority: str, agent_id: str, request: Request, limit: int = LimitQuery, cursor: Optional[str] = CursorQuery,
+                         ticket_ids: frozenset = Depends(agent_tickets), fields: Optional[str] = FieldsQuery):
+    projection = ticket_fields.projection(fields, ticket_fields.TICKET_FIELDS, {"_id": 0, "messages": 0})
+    page = paginate(db.tickets, {"priority": priority, "uuid": {"$in": list(ticket_ids)}}, projection, cursor, limit)
+    if not page["items"] and not cursor:
         raise HTTPException(status_code=404, detail=f"No tickets found with priority: {priority} assigned to Agent {agent_id}.")
 
-    return tickets
+    return page
 
 
 # ROUTES FOR FILTER IN TICKETS (admins)
-@router.get("/tickets/admins/customerID/{customer_id}", response_description="Get Ticket by customer ID", response_model=List[Ticket])
-async def get_tickets_custID(customer_id: str, request: Request):
-    tickets = list(db.tickets.find({"customer_id": customer_id}))
-    if tickets is None:
-        raise HTTPException(status_code=404, detail=f"Ticket with Customer ID: {customer_id} not found.")
-    
-    return tickets
-
-@router.get("/tickets/admins/status/{status}", response_description="Get a ticket by their Status", response_model=List[Ticket])
-async def get_tickets_status(status: str, request: Request):
-    tickets = list(db.tickets.find({"status": status}))
-    if tickets is None:
-        raise HTTPException(status_code=404, detail=f"Ticket with status: {status} not found.")
-    
-    return tickets
-
-@router.get("/tickets/admins/priority/{priority}", response_description="Get a ticket by their priority", response_model=List[Ticket])
-async def get_tickets_priority(priority: str, request: Request):
-    tickets = list(db.tickets.find({"priority": priority}))
-    if tickets is None:
-        raise HTTPException(status_code=404, detail=f"Ticket with priority: {priority} not found.")
+# Status, priority and customer filters also stream every match with "Accept: application/x-ndjson"
+@router.get("/tickets/admins/customerID/{customer_id}", response_description="Get Ticket by customer ID", response_model=TicketPage, response_model_exclude_unset=True)
+def get_tickets_custID(customer_id: str, request: Request, limit: int = LimitQuery, cursor: Optional[str] = CursorQuery,
+                       created_from: Optional[datetime] = CreatedFromQuery, created_to: Optional[datetime] = CreatedToQuery, fields: Optional[str] = FieldsQuery):
+    projection = ticket_fields.projection(fields, ticket_fields.TICKET_FIELDS, {"_id": 0, "messages": 0})
+    return ticket_page({"customer_id": customer_id}, projection, cursor, limit, created_from, created_to)
+
+@router.get("/tickets/admins/status/{status}", response_description="Get a ticket by their Status", response_model=TicketPage, response_model_exclude_unset=True)
+def get_tickets_status(status: str, request: Request, limit: int = LimitQuery, cursor: Optional[str] = CursorQuery,
+                       created_from: Optional[datetime] = CreatedFromQuery, created_to: Optional[datetime] = CreatedToQuery, fields: Optional[str] = FieldsQuery):
+    projection = ticket_fields.projection(fields, ticket_fields.TICKET_FIELDS, {"_id": 0, "messages": 0})
+    query = created_range({"status": status}, created_from, created_to)
+    if wants_ndjson(request):
+        return ndjson_response(db.tickets, query, projection)
+    params = {"status": status, "limit": limit, "cursor": cursor, "created_from": created_from, "created_to": created_to, "fields": fields}
+    return response_cache.cached("/tickets/admins/status", params, ["tickets"],
+                                 lambda: ticket_page({"status": status}, projection, cursor, limit, created_from, created_to))
+
+@router.get("/tickets/admins/priority/{priority}", response_description="Get a ticket by their priority", response_model=TicketPage, response_model_exclude_unset=True)
+def get_tickets_priority(priority: str, request: Request, limit: int = LimitQuery, cursor: Optional[str] = CursorQuery,
+                       created_from: Optional[datetime] = CreatedFromQuery, created_to: Optional[datetime] = CreatedToQuery, fields: Optional[str] = FieldsQuery):
+    projection = ticket_fields.projection(fields, ticket_fields.TICKET_FIELDS, {"_id": 0, "messages": 0})
+    query = created_range({"priority": priority}, created_from, created_to)
+    if wants_ndjson(request):
+        return ndjson_response(db.tickets, query, projection)
+    params = {"priority": priority, "limit": limit, "cursor": cursor, "created_from": created_from, "created_to": created_to, "fields": fields}
+    return response_cache.cached("/tickets/admins/priority", params, ["tickets"],
+                                 lambda: ticket_page({"priority": priority}, projection, cursor, limit, created_from, created_to))
     
-    return tickets
-    
-# GET ALL TICKETS
-@router.get("/tickets/", response_model=List[Ticket])
-async def get_tickets():
-    tickets = list(db.tickets.find({}, {"_id": 0})) 
-    if tickets is None:
-        raise HTTPException(status_code=404, detail=f"No tickets")
-    
-    return tickets
-
 # UPDATES
 
 # TICKET UPDATE STATUS OR PRIORITY
 
 @router.patch("/tickets/{ticket_id}", response_model=Ticket, response_description="Update ticket status or priority")
-async def update_ticket(ticket_id: str, updates: dict):
+def update_ticket(ticket_id: str, updates: dict):
     allowed_updates = {"status", "priority"}
     
     # Validar campos permitidos
     if not all(field in allowed_updates for field in updates.keys()):
         raise HTTPException(status_code=400, detail="Invalid fields. Only 'status' and 'priority' are allowed.")
 
-    # Obtener estado actual del ticket
-    existing_ticket = db.tickets.find_one({"uuid": ticket_id})
-    if not existing_ticket:
-        raise HTTPException(status_code=404, detail=f"Ticket with ID {ticket_id} not found.")
-    
-    # Actualizar ticket en MongoDB
-    updated_ticket = db.tickets.find_one_and_update(
+    # Keep the stored sort key in sync with the priority
+    if "priority" in updates:
+        updates["priority_rank"] = priority_rank(updates["priority"])
+
+    # Actualizar ticket en MongoDB. The rollups move from the atomic pre-image,
+    # a concurrent update of the same ticket is never counted from the same state
+    existing_ticket = db.tickets.find_one_and_update(
         {"uuid": ticket_id},
-        {"$set": updates},
-        {"$project": {"_id": 0, "uuid": 1, "status": 1, "created_timestamp": 1, "messages": 0}},
-        return_document=ReturnDocument.AFTER
+        {"$set": updates, "$inc": {"version": 1}},
+        {"_id": 0},
+        return_document=ReturnDocument.BEFORE
     )
+    if not existing_ticket:
+        raise HTTPException(status_code=404, detail=f"Ticket with ID {ticket_id} not found.")
+    updated_ticket = dict(existing_ticket, **updates, version=existing_ticket.get("version", 0) + 1)
+    reports.count_moved(db, [(existing_ticket, updated_ticket)])
+    response_cache.invalidate("tickets", "tickets:summary", "daily_reports", f"customer:{existing_ticket['customer_id']}")
     
     return updated_ticket
 
 
+# BULK STATUS/PRIORITY UPDATE (mass triage), propagated to Cassandra and Dgraph with
+# the sessions main.py keeps in app.state
+@router.post("/tickets/bulk_update", response_model=List[BulkUpdateResult], response_model_exclude_none=True)
+def bulk_update_tickets(request: Request, updates: List[BulkTicketUpdate] = Body(..., max_length=bulkupdate.BULK_UPDATE_MAX_ITEMS)):
+    try:
+        results, customer_ids = bulkupdate.bulk_update_tickets(
+            db, updates,
+            cassandra_session=getattr(request.app.state, "cassandra_session", None),
+            dgraph_client=getattr(request.app.state, "dgraph_client", None),
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error updating tickets: {str(e)}")
+
+    response_cache.invalidate("tickets", "tickets:summary", "daily_reports", *(f"customer:{customer_id}" for customer_id in customer_ids))
+    return results
+
+
 # AGGREGATIONS
-@router.get("/tickets/admins/recent", response_model=List[Dict[str, Any]])
-def get_recent_tickets(status, limit: int = 3):
+@router.get("/tickets/admins/recent", response_model=List[TicketView], response_model_exclude_unset=True)
+def get_recent_tickets(status, limit: int = 3, fields: Optional[str] = FieldsQuery):
+    projection = ticket_fields.projection(fields, ticket_fields.SUMMARY_TICKET_FIELDS, {"_id": 0, "uuid": 1, "status": 1, "created_timestamp": 1})
 
     try:
         pipeline = [
             {"$match": {"status": status}},
             {"$sort": {"created_timestamp": 1}},
             {"$limit": limit},
-            {"$project": {"_id": 0, "uuid": 1, "status": 1, "created_timestamp": 1}}
+            {"$project": projection}
         ]
-        result = list(db.tickets.aggregate(pipeline))
+        result = response_cache.cached("/tickets/admins/recent", {"status": status, "limit": limit, "fields": fields}, ["tickets:summary"],
+                                       lambda: list(db.tickets.aggregate(pipeline)))
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching recent tickets: {str(e)}")
 
-@router.get("/tickets/recent", response_model=List[Dict[str, Any]])
-def get_recent_tickets(status, agent_id: str, limit: int = 3):
+@router.get("/tickets/recent", response_model=List[TicketView], response_model_exclude_unset=True)
+def get_recent_tickets(status, agent_id: str, limit: int = 3, fields: Optional[str] = FieldsQuery):
+    projection = ticket_fields.projection(fields, ticket_fields.SUMMARY_TICKET_FIELDS, {"_id": 0, "uuid": 1, "status": 1, "created_timestamp": 1})
 
     try:
+        # agent_id is stored on the ticket: filter first, then sort and limit on the index
         pipeline = [
-            {"$match": {"status": status}}, 
+            {"$match": {"agent_id": agent_id, "status": status}},
             {"$sort": {"created_timestamp": -1}},  
             {"$limit": limit},  
-            {"$lookup": {  
-                "from": "agent_assignments",
-                "localField": "uuid",
-                "foreignField": "ticket_id",
-                "as": "assigned_agents"
-            }},
-            {"$match": {"assigned_agents.agent_id": agent_id}},
-            {"$project": {"_id": 0, "uuid": 1, "status": 1, "created_timestamp": 1}}
+            {"$project": projection}
         ]
-        result = list(db.tickets.aggregate(pipeline))
+        result = response_cache.cached("/tickets/recent", {"status": status, "agent_id": agent_id, "limit": limit, "fields": fields}, ["tickets:summary"],
+                                       lambda: list(db.tickets.aggregate(pipeline)))
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching recent tickets: {str(e)}")
 
-@router.get("/tickets/priority_level", response_model=List[Dict[str, Any]])
-def fetch_tickets_by_prioritylevels(agent_id: str, limit: int = 3):
+@router.get("/tickets/priority_level", response_model=List[TicketView], response_model_exclude_unset=True)
+def fetch_tickets_by_prioritylevels(agent_id: str, limit: int = 3, fields: Optional[str] = FieldsQuery):
+    projection = ticket_fields.projection(fields, ticket_fields.SUMMARY_TICKET_FIELDS, {"_id": 0, "uuid": 1, "priority": 1, "status": 1, "created_timestamp": 1})
 
     try:
         pipeline = [
-            {"$lookup": {
-                "from": "agent_assignments",
-                "localField": "uuid",
-                "foreignField": "ticket_id",
-                "as": "assigned_agents"
-            }},
-            {"$match": {"assigned_agents.agent_id": agent_id}},  
-            {"$addFields": {
-                "priority_sort_order": {
-                    "$switch": {  
-                        "branches": [
-                            {"case": {"$eq": ["$priority", "high"]}, "then": 1},
-                            {"case": {"$eq": ["$priority", "medium"]}, "then": 2},
-                            {"case": {"$eq": ["$priority", "low"]}, "then": 3}
-                        ],
-                        "default": 4 
-                    }
-                }
-            }},
-            {"$sort": {"priority_sort_order": 1, "created_timestamp": -1}}, 
+            {"$match": {"agent_id": agent_id}},  
+            # priority_rank is stored on the ticket, the sort reads agent_priority_created_index in order
+            {"$sort": {"priority_rank": 1, "created_timestamp": -1}}, 
             {"$limit": limit}, 
-            {"$project": {"_id": 0, "uuid": 1, "priority": 1, "status": 1, "created_timestamp": 1, "messages":0}}  
+            {"$project": projection}  
         ]
 
-        result = list(db.tickets.aggregate(pipeline))
+        result = response_cache.cached("/tickets/priority_level", {"agent_id": agent_id, "limit": limit, "fields": fields}, ["tickets:summary"],
+                                       lambda: list(db.tickets.aggregate(pipeline)))
 
         return result
 
@@ -291,37 +349,21 @@ def fetch_tickets_by_prioritylevels(agent_id: str, limit: int = 3):
         raise HTTPException(status_code=500, detail=f"Error fetching recent tickets: {str(e)}")
 
 
-@router.get("/tickets/admins/priority_level", response_model=List[Dict[str, Any]])
-def fetch_tickets_admins_by_prioritylevels(limit: int = 6):
+@router.get("/tickets/admins/priority_level", response_model=List[TicketView], response_model_exclude_unset=True)
+def fetch_tickets_admins_by_prioritylevels(limit: int = 6, fields: Optional[str] = FieldsQuery):
+    projection = ticket_fields.projection(fields, ticket_fields.SUMMARY_TICKET_FIELDS, {"_id": 0, "uuid": 1, "priority": 1, "agent_id": 1, "status": 1, "created_timestamp": 1})
 
     try:
         pipeline = [
-            {"$addFields": {
-                "priority_sort_order": {
-                    "$switch": { 
-                        "branches": [
-                            {"case": {"$eq": ["$priority", "high"]}, "then": 1},
-                            {"case": {"$eq": ["$priority", "medium"]}, "then": 2},
-                            {"case": {"$eq": ["$priority", "low"]}, "then": 3}
-                        ],
-                        "default": 4  
-                    }
-                }
-            }},
-            {"$lookup": {
-                "from": "agent_assignments",  
-                "localField": "uuid", 
-                "foreignField": "ticket_id", 
-                "as": "agent_info" 
-            }},
-            {"$unwind": "$agent_info"},
-
-            {"$sort": {"priority_sort_order": 1, "created_timestamp": 1}}, 
+            # Only assigned tickets, like the former $lookup + $unwind
+            {"$match": {"agent_id": {"$ne": None}}},
+            {"$sort": {"priority_rank": 1, "created_timestamp": 1}}, 
             {"$limit": limit}, 
-            {"$project": {"_id": 0, "uuid": 1, "priority": 1, "agent_id": "$agent_info.agent_id", "status": 1, "created_timestamp": 1, "messages":0}} 
+            {"$project": projection} 
         ]
 
-        result = list(db.tickets.aggregate(pipeline))
+        result = response_cache.cached("/tickets/admins/priority_level", {"limit": limit, "fields": fields}, ["tickets:summary"],
+                                       lambda: list(db.tickets.aggregate(pipeline)))
 
         return result
 
@@ -330,56 +372,41 @@ def fetch_tickets_admins_by_prioritylevels(limit: int = 6):
 
 
 # HELP TO QUERY TICKETS GIVEN TO AGENTS
-@router.get("/tickets/agent/{agent_id}")
-def get_tickets_by_agent(agent_id: str):
-    agents = list(db.agent_assignments.find({"agent_id": agent_id}))
-    if not agents:
-        raise HTTPException(status_code=404, detail="Agent not found")
-
-    ticket_ids = [assignment.get("ticket_id") for assignment in agents]
-    if not ticket_ids:
-        return {"message": "No tickets assigned to this agent"}
-
-    tickets = list(db.tickets.find({"uuid": {"$in": ticket_ids}}, {"_id": 0, "uuid": 1, "status":1, "priority":1, "messages":0, "created_timestamp": 0}))
-    return tickets
+@router.get("/tickets/agent/{agent_id}", response_model=TicketPage, response_model_exclude_unset=True)
+def get_tickets_by_agent(agent_id: str, limit: int = LimitQuery, cursor: Optional[str] = CursorQuery,
+                         ticket_ids: frozenset = Depends(agent_tickets), fields: Optional[str] = FieldsQuery):
+    projection = ticket_fields.projection(fields, ticket_fields.SUMMARY_TICKET_FIELDS, {"_id": 0, "uuid": 1, "status": 1, "priority": 1})
+    return paginate(db.tickets, {"uuid": {"$in": list(ticket_ids)}}, projection, cursor, limit)
 
 
 
 # RETRIEVE TICKET FEEDBACK
 @router.get("/tickets/{ticket_uuid}/feedback", response_model=Dict[str, Any])
-async def get_ticket_feedback(ticket_uuid: str, agent_id: str = None):
-    if not agent_id:
-        raise HTTPException(status_code=422, detail="Agent ID is required")
-
-    agents = list(db.agent_assignments.find({"agent_id": agent_id}))
-    if not agents:
-        raise HTTPException(status_code=404, detail="Agent not found")
-
-    ticket_ids = [assignment.get("ticket_id") for assignment in agents]
-    if not ticket_ids:
-        return {"message": "No tickets assigned to this agent"}
+def get_ticket_feedback(ticket_uuid: str, agent_id: str, request: Request, response: Response, ticket_ids: frozenset = Depends(agent_tickets)):
+    if ticket_uuid not in ticket_ids:
+        raise HTTPException(status_code=404, detail="Ticket not found")
 
     try:
-        ticket = db.tickets.find_one({"uuid": ticket_uuid, "uuid": {"$in": ticket_ids}}, {"_id": 0, "feedback": 1, "messages":0, "created_timestamp": 0})
+        ticket = db.tickets.find_one({"uuid": ticket_uuid}, {"_id": 0, "uuid": 1, "version": 1, "feedback": 1})
 
         if not ticket:
             raise HTTPException(status_code=404, detail="Ticket not found")
 
-        return ticket.get("feedback", {})
+        return conditional(request, response, document_etag(ticket), ticket.get("feedback", {}))
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving ticket feedback: {str(e)}")
 
 
 @router.get("/tickets/admins/{ticket_uuid}/feedback", response_model=Dict[str, Any])
-async def get_ticket_feedback(ticket_uuid: str):
+def get_ticket_feedback(ticket_uuid: str, request: Request, response: Response):
     try:
-        ticket = db.tickets.find_one({"uuid": ticket_uuid}, {"_id": 0, "feedback": 1, "messages":0, "created_timestamp": 0})
+        ticket = db.tickets.find_one({"uuid": ticket_uuid}, {"_id": 0, "uuid": 1, "version": 1, "feedback": 1})
 
         if not ticket:
             raise HTTPException(status_code=404, detail="Ticket not found")
 
-        return ticket.get("feedback", {})
+        return conditional(request, response, document_etag(ticket), ticket.get("feedback", {}))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving ticket feedback: {str(e)}")
 
@@ -389,9 +416,9 @@ class MessageRequest(BaseModel):
     text: str
 
 @router.post("/tickets/{ticket_uuid}/messages", response_model=Dict[str, Any])
-async def add_message_to_ticket(ticket_uuid: str, customer_id: str, message: MessageRequest = Body(...)):
+def add_message_to_ticket(ticket_uuid: str, customer_id: str, message: MessageRequest = Body(...)):
     try:
-        ticket = db.tickets.find_one({"uuid": ticket_uuid, "customer_id": customer_id})
+        ticket = db.tickets.find_one({"uuid": ticket_uuid, "customer_id": customer_id}, {"_id": 1})
         
         if not ticket:
             raise HTTPException(status_code=404, detail="Ticket not found or does not belong to this customer")
@@ -404,28 +431,65 @@ async def add_message_to_ticket(ticket_uuid: str, customer_id: str, message: Mes
             "message_text": message.text
         }
 
-        db.tickets.update_one(
-            {"uuid": ticket_uuid},
-            {"$push": {"messages": new_message}}
-        )
+        # The ticket document itself is left untouched
+        ticket_messages.append_message(db, ticket_uuid, new_message)
 
         return {"message": "Message added successfully", "ticket_uuid": ticket_uuid, "new_message": new_message}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error adding message to ticket: {str(e)}")
 
+@router.get("/tickets/{ticket_uuid}/messages", response_model=MessagePage, response_model_exclude_unset=True)
+def get_ticket_messages(ticket_uuid: str, limit: int = LimitQuery, cursor: Optional[str] = CursorQuery):
+    if not db.tickets.find_one({"uuid": ticket_uuid}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    return ticket_messages.message_page(db, ticket_uuid, cursor, limit)
+
+# Daily reports are folded from the ticket_rollups of each day, declared before
+# /daily_reports/{report_date} so "range" is not read as a date
+@router.get("/daily_reports/range", response_model=List[DailyReport])
+def get_daily_report_range(start_date: date, end_date: date, request: Request, response: Response):
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    if (end_date - start_date).days >= reports.REPORT_RANGE_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {reports.REPORT_RANGE_MAX_DAYS} days per request")
+
+    try:
+        report_range = response_cache.cached("/daily_reports/range", {"start_date": start_date, "end_date": end_date}, ["daily_reports"],
+                                             lambda: reports.daily_reports(db, start_date, end_date))
+        return conditional(request, response, list_etag(report_range), report_range)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching daily reports: {str(e)}")
+
 @router.get("/daily_reports/{report_date}", response_model=DailyReport)
-async def get_daily_report(report_date: str):
+def get_daily_report(report_date: date, request: Request, response: Response):
     try:
-        report = db.daily_reports.find_one({"report_date": report_date}, {"_id": 0})
+        report = response_cache.cached("/daily_reports", {"report_date": report_date}, ["daily_reports"],
+                                       lambda: reports.daily_reports(db, report_date, report_date)[0])
         
-        if not report:
+        if not report["ticket_count"]:
             raise HTTPException(status_code=404, detail="Daily report not found for the given date")
         
-        return report
+        return conditional(request, response, document_etag(report), report)
+    except HTTPException:
+        # A day without tickets is a 404, not a failure
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching daily report: {str(e)}")
 
+# Recount the rollups of a date range with one $group aggregation (after a bulk load or an import)
+@router.post("/daily_reports/build", response_model=List[DailyReport])
+def build_daily_reports(start_date: date, end_date: date):
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+
+    try:
+        built = reports.build_daily_reports(db, start_date, end_date)
+        response_cache.invalidate("daily_reports")
+        return built
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error building daily reports: {str(e)}")
+
 
 class UpdateUserProfile(BaseModel):
     name: Optional[str] = None
@@ -437,7 +501,7 @@ class UpdateUserProfile(BaseModel):
 
 # UPDATE USER PROFILE INFO
 @router.put("/users/{user_id}/profile", response_model=Dict[str, str])
-async def update_user_profile(user_id: str, profile_update: UpdateUserProfile):
+def update_user_profile(user_id: str, profile_update: UpdateUserProfile):
     try:
         # Prepare the fields to update
         update_data = {f"profile.{key}": value for key, value in profile_update.dict(exclude_none=True).items()}
@@ -459,31 +523,26 @@ async def update_user_profile(user_id: str, profile_update: UpdateUserProfile):
 
 # TICKET UPDATE RESOLUTIONS STEPS
 @router.put("/tickets/{ticket_uuid}/resolution_steps", response_model=Dict[str, str])
-async def update_resolution_steps(
+def update_resolution_steps(
     ticket_uuid: str, 
     update_steps: UpdateResolutionSteps, 
-    agent_id: str
+    agent_id: str,
+    ticket_ids: frozenset = Depends(agent_tickets)
 ):
     try:
-        agents = list(db.agent_assignments.find({"agent_id": agent_id}))
-        if not agents:
-            raise HTTPException(status_code=404, detail="Agent not found")
-
-        ticket_ids = [assignment.get("ticket_id") for assignment in agents]
-        if not ticket_ids:
-            return {"message": "No tickets assigned to this agent"}
-        
         if ticket_uuid not in ticket_ids:
             return {"message": "Ticket not assigned to this agent"}
 
 
-        result = db.tickets.update_one(
+        ticket = db.tickets.find_one_and_update(
             {"uuid": ticket_uuid},
-            {"$set": {"resolution_steps": update_steps.steps}}
+            {"$set": {"resolution_steps": update_steps.steps}, "$inc": {"version": 1}},
+            {"_id": 0, "customer_id": 1}
         )
 
-        if result.matched_count == 0:
+        if ticket is None:
             raise HTTPException(status_code=404, detail="Ticket not found.")
+        response_cache.invalidate("tickets", f"customer:{ticket['customer_id']}")
 
         return {"message": "Resolution steps updated successfully."}
 
@@ -491,18 +550,20 @@ async def update_resolution_steps(
         raise HTTPException(status_code=500, detail=f"Error updating resolution steps: {str(e)}")
 
 @router.put("/tickets/admins/{ticket_uuid}/resolution_steps", response_model=Dict[str, str])
-async def update_admins_resolution_steps(
+def update_admins_resolution_steps(
     ticket_uuid: str, 
     update_steps: UpdateResolutionSteps, 
 ):
     try:
-        result = db.tickets.update_one(
+        ticket = db.tickets.find_one_and_update(
             {"uuid": ticket_uuid},
-            {"$set": {"resolution_steps": update_steps.steps}}
+            {"$set": {"resolution_steps": update_steps.steps}, "$inc": {"version": 1}},
+            {"_id": 0, "customer_id": 1}
         )
 
-        if result.matched_count == 0:
+        if ticket is None:
             raise HTTPException(status_code=404, detail="Ticket not found.")
+        response_cache.invalidate("tickets", f"customer:{ticket['customer_id']}")
 
         return {"message": "Resolution steps updated successfully."}
 
@@ -510,38 +571,75 @@ async def update_admins_resolution_steps(
         raise HTTPException(status_code=500, detail=f"Error updating resolution steps: {str(e)}")
 
 @router.delete("/tickets/{ticket_id}", response_model=Dict[str, str])
-async def delete_ticket(ticket_id: str):
+def delete_ticket(ticket_id: str):
 
     try:
-        result = db.tickets.delete_one({"uuid": ticket_id})
+        ticket = db.tickets.find_one_and_delete({"uuid": ticket_id}, {"_id": 0, "customer_id": 1, "created_timestamp": 1, "channel": 1, "status": 1, "priority": 1})
 
-        if result.deleted_count == 0:
+        if ticket is None:
             raise HTTPException(status_code=404, detail="Ticket not found.")
+        db.message_buckets.delete_many({"ticket_id": ticket_id})
+        reports.count_deleted(db, [ticket])
+        response_cache.invalidate("tickets", "tickets:summary", "daily_reports", f"customer:{ticket['customer_id']}")
 
         return {"message": "Ticket deleted successfully."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting ticket: {str(e)}")
 
 
-@router.get("/tickets/customer/{customer_id}", response_model=List[Dict[str, Any]])
-async def get_tickets_by_customer(customer_id: str):
+@router.get("/tickets/customer/{customer_id}", response_model=TicketPage, response_model_exclude_unset=True)
+def get_tickets_by_customer(customer_id: str, request: Request, response: Response, limit: int = LimitQuery, cursor: Optional[str] = CursorQuery,
+                            created_from: Optional[datetime] = CreatedFromQuery, created_to: Optional[datetime] = CreatedToQuery, fields: Optional[str] = FieldsQuery):
+    # version is always read for the ETag
+    projection = ticket_fields.projection(fields, ticket_fields.CUSTOMER_TICKET_FIELDS, {"_id": 0, "messages": 0, "created_timestamp": 0}, always=("uuid", "version"))
+    if wants_ndjson(request):
+        return ndjson_response(db.tickets, created_range({"customer_id": customer_id}, created_from, created_to), projection)
 
     try:
-        tickets = list(db.tickets.find({"customer_id": customer_id}, {"_id": 0, "messages":0, "created_timestamp": 0}))
+        params = {"customer_id": customer_id, "limit": limit, "cursor": cursor, "created_from": created_from, "created_to": created_to, "fields": fields}
+        page = response_cache.cached("/tickets/customer", params, [f"customer:{customer_id}"],
+                                     lambda: ticket_page({"customer_id": customer_id}, projection, cursor, limit, created_from, created_to))
 
-        if not tickets:
+        if not page["items"] and not cursor:
             raise HTTPException(status_code=404, detail="No tickets found for this customer.")
 
-        return tickets
+        return conditional(request, response, list_etag(page["items"], cursor, limit, fields), page)
+    except HTTPException:
+        # Invalid cursor (400) and no tickets (404) are returned as they are
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving tickets: {str(e)}")
 
 
+# Full-text search over descriptions, resolution steps and messages, best matches first
+@router.get("/tickets/search", response_model=TicketSearchPage, response_model_exclude_unset=True)
+def search_tickets(q: str = Query(..., min_length=1, max_length=200, description="Words or \"exact phrase\" to look for"),
+                   limit: int = LimitQuery, cursor: Optional[str] = CursorQuery, fields: Optional[str] = FieldsQuery):
+    projection = ticket_fields.projection(fields, ticket_fields.SEARCH_TICKET_FIELDS, search.SEARCH_FIELDS)
+    return search.search_tickets(db, q, cursor, limit, projection)
+
+
+# Single ticket, declared after the other GET /tickets/<name> routes so they match first
+@router.get("/tickets/{ticket_uuid}", response_model=TicketView, response_model_exclude_unset=True)
+def get_ticket(ticket_uuid: str, request: Request, response: Response, fields: Optional[str] = FieldsQuery):
+    projection = ticket_fields.projection(fields, ticket_fields.TICKET_FIELDS, {"_id": 0, "messages": 0}, always=("uuid", "version"))
+    ticket = db.tickets.find_one({"uuid": ticket_uuid}, projection)
+    if not ticket:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    return conditional(request, response, document_etag(ticket), ticket)
+
+
+# Hit/miss counters of the response cache, per route
+@router.get("/cache/stats", response_model=Dict[str, Any])
+def get_cache_stats():
+    return response_cache.metrics()
+
+
 #Base URL
 @router.get("/")
-async def root():
+def root():
     return {"message": "Welcome to the API! Access /users/ to manage users."}
     
 @router.get("/nothing/")
-async def base_result():
+def base_result():
     return {"message": "No results for query found"}
\ No newline at end of file
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+from collections import defaultdict
+
+from fastapi import HTTPException
+
+from .pagination import encode_cursor, decode_cursor
+
+# Ticket search over the text indexes of tickets (description, resolution_steps)
+# and message_buckets (message text). A ticket scores the sum of its best
+# ticket and message matches. The ranking is computed from the best
+# SEARCH_MAX_RESULTS matches of each collection and pages are cut from it.
+SEARCH_MAX_RESULTS = 1000
+
+# Returned for every result by default, the whole document is never read
+SEARCH_FIELDS = {"_id": 0, "uuid": 1, "customer_id": 1, "description": 1, "status": 1, "priority": 1,
+                 "category": 1, "channel": 1, "created_timestamp": 1}
+
+
+def ticket_scores(db, text):
+    scores = defaultdict(float)
+    matches = db.tickets.find(
+        {"$text": {"$search": text}},
+        {"_id": 0, "uuid": 1, "score": {"$meta": "textScore"}},
+    ).sort([("score", {"$meta": "textScore"})]).limit(SEARCH_MAX_RESULTS)
+    for ticket in matches:
+        scores[ticket["uuid"]] += ticket["score"]
+
+    # Several buckets of a ticket can match, the best one counts
+    matches = db.message_buckets.aggregate([
+        {"$match": {"$text": {"$search": text}}},
+        {"$group": {"_id": "$ticket_id", "score": {"$max": {"$meta": "textScore"}}}},
+        {"$sort": {"score": -1}},
+        {"$limit": SEARCH_MAX_RESULTS},
+    ])
+    for bucket in matches:
+        scores[bucket["_id"]] += bucket["score"]
+    return scores
+
+
+def search_tickets(db, text, cursor=None, limit=50, projection=SEARCH_FIELDS):
+    """
+    Tickets matching the text, best first (ties by uuid). The cursor is the
+    (score, uuid) of the last result of the previous page.
+    """
+    ranking = sorted(ticket_scores(db, text).items(), key=lambda match: (-match[1], match[0]))
+    if cursor:
+        value = decode_cursor(cursor)
+        # Cursors of other routes decode fine but are not [score, uuid]
+        if (not isinstance(value, list) or len(value) != 2 or isinstance(value[0], bool)
+                or not isinstance(value[0], (int, float)) or not isinstance(value[1], str)):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        last_score, last_uuid = value
+        ranking = [(uuid, score) for uuid, score in ranking if (-score, uuid) > (-last_score, last_uuid)]
+
+    page = ranking[:limit]
+    tickets = {ticket["uuid"]: ticket for ticket in db.tickets.find({"uuid": {"$in": [uuid for uuid, _ in page]}}, projection)}
+    # Tickets deleted since their messages were indexed are skipped
+    items = [dict(tickets[uuid], score=score) for uuid, score in page if uuid in tickets]
+    next_cursor = encode_cursor([page[-1][1], page[-1][0]]) if len(ranking) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
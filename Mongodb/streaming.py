@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+import json
+from datetime import date
+
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = 1000
+
+
+def wants_ndjson(request):
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def json_default(value):
+    # Same ISO format FastAPI uses for dates in the JSON responses
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def ndjson_lines(collection, query, projection, batch_size=STREAM_BATCH_SIZE):
+    # Documents are written as the cursor returns them, nothing is collected or validated first
+    for document in collection.find(query, projection, batch_size=batch_size).sort("uuid", 1):
+        yield json.dumps(document, default=json_default) + "\n"
+
+
+def ndjson_response(collection, query, projection):
+    """
+    Every document matching the query, one JSON object per line.
+    Starlette runs the sync generator in the thread pool, one cursor batch at a time.
+    """
+    return StreamingResponse(ndjson_lines(collection, query, projection), media_type=NDJSON_MEDIA_TYPE)
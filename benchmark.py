@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+PROJECT_API_URL = os.getenv("PROJECT_API_URL", "http://localhost:8003")
+
+# Read routes that hit Mongo on every request
+DEFAULT_PATHS = [
+    "/tickets/admins/status/open",
+    "/tickets/admins/priority/high",
+    "/tickets/customer/1",
+    "/users/customers",
+    "/tickets/admins/priority_level",
+]
+
+local = threading.local()
+
+
+def timed_get(url):
+    # One keep-alive session per client thread
+    if not hasattr(local, "session"):
+        local.session = requests.Session()
+    start = time.perf_counter()
+    try:
+        ok = local.session.get(url).ok
+    except requests.RequestException:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def percentile(sorted_values, fraction):
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run(base_url, paths, clients, total_requests):
+    urls = [base_url + paths[i % len(paths)] for i in range(total_requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        results = list(executor.map(timed_get, urls))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, ok in results if not ok)
+    print(f"{total_requests} requests, {clients} concurrent clients, {errors} errors")
+    print(f"Throughput: {total_requests / elapsed:.1f} req/s")
+    print(f"Latency p50: {percentile(latencies, 0.50) * 1000:.1f} ms, "
+          f"p99: {percentile(latencies, 0.99) * 1000:.1f} ms, "
+          f"max: {latencies[-1] * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test of the API read routes")
+    parser.add_argument("--url", default=PROJECT_API_URL)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("paths", nargs="*", default=DEFAULT_PATHS)
+    args = parser.parse_args()
+    run(args.url, args.paths, args.clients, args.requests)
+
+
+if __name__ == "__main__":
+    main()
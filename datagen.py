@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+import random
+import uuid
+from datetime import datetime, date, time, timedelta
+from itertools import islice
+from statistics import NormalDist
+
+
+SUPPORT_CHANNELS = ['phone', 'email', 'chat']
+STATUSES = ['open', 'resolved', 'in_progress']
+PRIORITIES = ['high', 'medium', 'low']
+FEEDBACK_RATINGS = [1, 2, 3, 4, 5]
+ESCALATION_LEVELS = ['level_1', 'level_2', 'level_3']
+
+# Relative weight of each hour of the day (support traffic peaks in office hours)
+HOURLY_WEIGHTS = [
+    1, 1, 1, 1, 1, 2, 3, 5,
+    8, 10, 10, 9, 8, 9, 10, 10,
+    9, 7, 5, 4, 3, 2, 2, 1,
+]
+
+# Skew defaults: customers are more concentrated than agents
+CUSTOMER_ZIPF_S = 1.1
+AGENT_ZIPF_S = 0.8
+BURST_SHARE = 0.3  # fraction of the tickets of a day that fall inside a burst
+SECONDS_PER_DAY = 24 * 60 * 60
+CDF_STEP = 60  # seconds between the points of the tabulated timestamp distribution
+
+
+def chunked(iterable, size):
+    # Group any iterable into lists of at most `size` items without materializing it
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def zipf_index(rng, n, s):
+    # Inverse CDF of a continuous power law on [1, n+1): O(1) memory even for millions of ids
+    u = rng.random()
+    if s == 1:
+        x = (n + 1) ** u
+    else:
+        x = (((n + 1) ** (1 - s) - 1) * u + 1) ** (1 / (1 - s))
+    return min(int(x), n)
+
+
+def generate_users(agent_count, customer_count):
+    # Agents first and then customers, ids start at 1 for each role
+    for agent_id in range(1, agent_count + 1):
+        yield {
+            "role": "agent",
+            "user_id": agent_id,
+            "username": f"agent_{agent_id}",
+            "email": f"agent{agent_id}@example.com",
+            "name": f"Agent {agent_id}",
+        }
+    for customer_id in range(1, customer_count + 1):
+        yield {
+            "role": "customer",
+            "user_id": customer_id,
+            "username": f"customer_{customer_id}",
+            "email": f"customer{customer_id}@example.com",
+            "name": f"Customer {customer_id}",
+        }
+
+
+def day_ticket_counts(rng, ticket_count, start_date, days):
+    # Split the total between days with a noisy volume per day and quieter weekends
+    weights = []
+    for offset in range(days):
+        day = start_date + timedelta(days=offset)
+        weekday_factor = 0.5 if day.weekday() >= 5 else 1.0
+        weights.append(rng.lognormvariate(0, 0.5) * weekday_factor)
+    total = sum(weights)
+
+    # Cumulative rounding so the counts always add up to ticket_count
+    counts = []
+    cumulative = 0.0
+    assigned = 0
+    for weight in weights:
+        cumulative += weight
+        target = round(cumulative / total * ticket_count)
+        counts.append(target - assigned)
+        assigned = target
+    return counts
+
+
+def day_cdf(bursts):
+    """
+    Distribution of the second of the day of a ticket, tabulated every CDF_STEP
+    seconds: a business-hours baseline plus a few short bursts (outages,
+    campaigns...) that take BURST_SHARE of the tickets when there are any.
+    """
+    burst_share = BURST_SHARE if bursts else 0.0
+    hour_total = sum(HOURLY_WEIGHTS)
+    normals = [NormalDist(center, width) for center, width in bursts]
+    cdf = []
+    for second in range(0, SECONDS_PER_DAY + 1, CDF_STEP):
+        hour, into_hour = divmod(second, 3600)
+        baseline = (sum(HOURLY_WEIGHTS[:hour]) + (HOURLY_WEIGHTS[hour] * into_hour / 3600 if hour < 24 else 0)) / hour_total
+        # Burst times are clamped to the day, what falls outside lands on its ends
+        burst = sum(normal.cdf(second) for normal in normals) / len(normals) if second < SECONDS_PER_DAY else 1.0
+        cdf.append((1 - burst_share) * baseline + burst_share * burst)
+    return cdf
+
+
+def sorted_uniforms(rng, count):
+    """
+    `count` sorted uniforms on [0, 1) in order, in constant memory (exponential
+    spacings: the partial sums of count + 1 exponentials over their total). The
+    total is computed by a first pass over a replayed generator.
+    """
+    seed = rng.getrandbits(64)
+    spacings = random.Random(seed)
+    total = sum(spacings.expovariate(1) for _ in range(count + 1))
+    spacings = random.Random(seed)
+    cumulative = 0.0
+    for _ in range(count):
+        cumulative += spacings.expovariate(1)
+        yield cumulative / total
+
+
+def day_timestamps(rng, day, count):
+    # Timestamps come out in order without holding the day: sorted uniforms through the inverse CDF
+    bursts = [
+        (rng.uniform(0, SECONDS_PER_DAY), rng.uniform(300, 3600))
+        for _ in range(rng.randint(0, 3))
+    ]
+    cdf = day_cdf(bursts)
+    midnight = datetime.combine(day, time())
+    step = 0
+    previous = -1
+    for u in sorted_uniforms(rng, count):
+        while step < len(cdf) - 2 and cdf[step + 1] <= u:
+            step += 1
+        low, high = cdf[step], cdf[step + 1]
+        second = step * CDF_STEP + (CDF_STEP * (u - low) / (high - low) if high > low else 0)
+        # Keep every timestamp unique inside the day
+        micros = max(min(int(second * 1_000_000), SECONDS_PER_DAY * 1_000_000 - 1), previous + 1)
+        previous = micros
+        yield midnight + timedelta(microseconds=micros)
+
+
+def generate_tickets(ticket_count, agent_count, customer_count, days=1, seed=None, start_date=None):
+    """
+    Yield synthetic tickets one at a time, ordered by created_timestamp.
+
+    The same seed and start_date always produce the same stream. Memory use is
+    constant, it depends neither on ticket_count nor on the tickets of a day.
+    """
+    rng = random.Random(seed)
+    if start_date is None:
+        start_date = date.today() - timedelta(days=days - 1)
+
+    ticket_id = 0
+    counts = day_ticket_counts(rng, ticket_count, start_date, days)
+    for offset, count in enumerate(counts):
+        day = start_date + timedelta(days=offset)
+        for created_timestamp in day_timestamps(rng, day, count):
+            ticket_id += 1
+            yield {
+                "seq": ticket_id - 1,
+                "ticket_id": ticket_id,
+                "customer_id": zipf_index(rng, customer_count, CUSTOMER_ZIPF_S),
+                "agent_id": zipf_index(rng, agent_count, AGENT_ZIPF_S),
+                "created_date": day,
+                "created_timestamp": created_timestamp,
+                "escalation_timestamp": created_timestamp + timedelta(seconds=rng.randint(0, 4 * 3600)),
+                "description": f"Ticket {ticket_id} issue description",
+                "status": rng.choice(STATUSES),
+                "priority": rng.choices(PRIORITIES, weights=[2, 5, 3])[0],
+                "feedback_rating": rng.choice(FEEDBACK_RATINGS),
+                "escalation_level": rng.choice(ESCALATION_LEVELS),
+                "support_channel": rng.choice(SUPPORT_CHANNELS),
+                "assignment_uuid": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            }
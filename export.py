@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import time
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from cassandra.cluster import Cluster
+from cassandra.query import SimpleStatement
+from pymongo import MongoClient
+
+import datagen
+
+CLUSTER_IPS = os.getenv('CASSANDRA_CLUSTER_IPS', 'localhost')
+KEYSPACE = os.getenv('CASSANDRA_KEYSPACE', 'final_project')
+MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017')
+DB_NAME = os.getenv('MONGODB_DB_NAME', 'final_project')
+
+DEFAULT_BATCH_SIZE = 10000
+
+TICKET_SCHEMA = pa.schema([
+    ("uuid", pa.string()),
+    ("customer_id", pa.string()),
+    ("description", pa.string()),
+    ("status", pa.string()),
+    ("priority", pa.string()),
+    ("created_timestamp", pa.timestamp("ms")),
+    ("updated_timestamp", pa.timestamp("ms")),
+    ("category", pa.string()),
+    ("channel", pa.string()),
+    ("feedback_rating", pa.int32()),
+    ("resolution_steps", pa.list_(pa.string())),
+    ("message_count", pa.int32()),
+    ("created_date", pa.string()),
+])
+
+ASSIGNMENT_SCHEMA = pa.schema([
+    ("uuid", pa.string()),
+    ("agent_id", pa.string()),
+    ("ticket_id", pa.string()),
+    ("assigned_timestamp", pa.timestamp("ms")),
+    ("priority_level", pa.string()),
+    ("assigned_date", pa.string()),
+])
+
+ACTIVITY_SCHEMA = pa.schema([
+    ("ticket_id", pa.int32()),
+    ("agent_id", pa.int32()),
+    ("activity_timestamp", pa.timestamp("ms")),
+    ("activity_type", pa.string()),
+    ("status", pa.string()),
+    ("activity_date", pa.string()),
+])
+
+ESCALATION_SCHEMA = pa.schema([
+    ("ticket_id", pa.int32()),
+    ("agent_id", pa.int32()),
+    ("escalation_timestamp", pa.timestamp("ms")),
+    ("escalation_level", pa.string()),
+    ("comments", pa.string()),
+    ("escalation_date", pa.string()),
+])
+
+
+# ROWS: documents and Cassandra rows flattened to the column layout of each schema
+def as_datetime(value):
+    # Mongo dates are BSON dates, documents not migrated yet still have ISO strings
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def ticket_row(ticket):
+    created_timestamp = as_datetime(ticket.get("created_timestamp"))
+    return {
+        "uuid": ticket["uuid"],
+        "customer_id": ticket["customer_id"],
+        "description": ticket.get("description"),
+        "status": ticket.get("status"),
+        "priority": ticket.get("priority"),
+        "created_timestamp": created_timestamp,
+        "updated_timestamp": as_datetime(ticket.get("updated_timestamp")),
+        "category": ticket.get("category"),
+        "channel": ticket.get("channel"),
+        "feedback_rating": (ticket.get("feedback") or {}).get("rating"),
+        "resolution_steps": ticket.get("resolution_steps") or [],
+        "message_count": ticket.get("message_count", 0),
+        "created_date": created_timestamp.date().isoformat() if created_timestamp else "",
+    }
+
+
+def assignment_row(assignment):
+    assigned_timestamp = as_datetime(assignment.get("assigned_timestamp"))
+    return dict(assignment, assigned_timestamp=assigned_timestamp,
+                assigned_date=assigned_timestamp.date().isoformat() if assigned_timestamp else "")
+
+
+def activity_row(row):
+    return dict(row, activity_date=row["activity_timestamp"].date().isoformat())
+
+
+def escalation_row(row):
+    return dict(row, escalation_date=row["escalation_timestamp"].date().isoformat())
+
+
+def with_message_counts(db, tickets, batch_size):
+    # Messages live in message_buckets: one $group over the buckets of each batch of tickets
+    for batch in datagen.chunked(tickets, batch_size):
+        counts = {
+            group["_id"]: group["count"]
+            for group in db.message_buckets.aggregate([
+                {"$match": {"ticket_id": {"$in": [ticket["uuid"] for ticket in batch]}}},
+                {"$group": {"_id": "$ticket_id", "count": {"$sum": "$count"}}},
+            ])
+        }
+        for ticket in batch:
+            # Tickets not migrated yet still embed their messages
+            yield dict(ticket, message_count=counts.get(ticket["uuid"], 0) + len(ticket.get("messages") or []))
+
+
+def mongo_rows(db, collection, to_row, batch_size):
+    # The cursor fetches batch_size documents per round trip, the collection is never materialized
+    documents = db[collection].find({}, {"_id": 0}, batch_size=batch_size)
+    if collection == "tickets":
+        documents = with_message_counts(db, documents, batch_size)
+    for document in documents:
+        yield to_row(document)
+
+
+def cassandra_rows(session, table, to_row, batch_size):
+    # fetch_size turns the full table scan into pages the driver requests lazily
+    statement = SimpleStatement(f"SELECT * FROM {table}", fetch_size=batch_size)
+    for row in session.execute(statement):
+        yield to_row(row._asdict())
+
+
+# Source, row builder, schema and partition column of every exportable dataset
+DATASETS = {
+    "tickets": ("mongo", "tickets", ticket_row, TICKET_SCHEMA, "created_date"),
+    "agent_assignments": ("mongo", "agent_assignments", assignment_row, ASSIGNMENT_SCHEMA, "assigned_date"),
+    "activity_by_ticket": ("cassandra", "activity_by_ticket", activity_row, ACTIVITY_SCHEMA, "activity_date"),
+    "escalation_by_ticket": ("cassandra", "escalation_by_ticket", escalation_row, ESCALATION_SCHEMA, "escalation_date"),
+}
+
+
+# WRITERS
+def write_parquet(rows, schema, partition_column, out_dir, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Write rows as hive-style partitions (<out_dir>/<column>=<value>/part-N.parquet),
+    one file per partition and batch, so only one batch is ever held in memory.
+    """
+    count = 0
+    for batch_number, batch in enumerate(datagen.chunked(rows, batch_size)):
+        partitions = {}
+        for row in batch:
+            partitions.setdefault(row[partition_column], []).append(row)
+        for value, partition_rows in partitions.items():
+            partition_dir = os.path.join(out_dir, f"{partition_column}={value}")
+            os.makedirs(partition_dir, exist_ok=True)
+            table = pa.Table.from_pylist(partition_rows, schema=schema).drop_columns([partition_column])
+            pq.write_table(table, os.path.join(partition_dir, f"part-{batch_number:05d}.parquet"))
+        count += len(batch)
+    return count
+
+
+def write_arrow(rows, schema, out_path, batch_size=DEFAULT_BATCH_SIZE):
+    # A single Arrow IPC stream, one record batch per cursor batch
+    count = 0
+    with pa.OSFile(out_path, "wb") as sink, pa.ipc.new_stream(sink, schema) as stream:
+        for batch in datagen.chunked(rows, batch_size):
+            stream.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+
+def export_dataset(name, file_format, out_dir, batch_size=DEFAULT_BATCH_SIZE, mongo_db=None, cassandra_session=None):
+    source, collection, to_row, schema, partition_column = DATASETS[name]
+    if source == "mongo":
+        rows = mongo_rows(mongo_db, collection, to_row, batch_size)
+    else:
+        rows = cassandra_rows(cassandra_session, collection, to_row, batch_size)
+
+    start = time.perf_counter()
+    if file_format == "parquet":
+        count = write_parquet(rows, schema, partition_column, os.path.join(out_dir, name), batch_size)
+    else:
+        os.makedirs(out_dir, exist_ok=True)
+        count = write_arrow(rows, schema, os.path.join(out_dir, f"{name}.arrows"), batch_size)
+    seconds = time.perf_counter() - start
+    print(f"Exported {count} rows of {name} in {seconds:.2f}s")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export tickets, assignments and Cassandra time series to Parquet/Arrow")
+    parser.add_argument("datasets", nargs="+", choices=DATASETS.keys())
+    parser.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    parser.add_argument("--out", default="export")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    sources = {DATASETS[name][0] for name in args.datasets}
+    mongodb_client = MongoClient(MONGODB_URI) if "mongo" in sources else None
+    cassandra_cluster = Cluster(CLUSTER_IPS.split(',')) if "cassandra" in sources else None
+    cassandra_session = cassandra_cluster.connect(KEYSPACE) if cassandra_cluster else None
+    try:
+        for name in args.datasets:
+            export_dataset(name, args.format, args.out, args.batch_size,
+                           mongo_db=mongodb_client[DB_NAME] if mongodb_client else None,
+                           cassandra_session=cassandra_session)
+    finally:
+        if cassandra_cluster:
+            cassandra_cluster.shutdown()
+        if mongodb_client:
+            mongodb_client.close()
+
+
+if __name__ == "__main__":
+    main()
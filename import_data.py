@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import json
+import os
+import resource
+import sys
+import time
+from typing import get_origin
+
+import pydgraph
+from cassandra.cluster import Cluster
+from pydantic import ValidationError
+from pymongo import MongoClient
+
+import datagen
+from Cassandra import writer
+from DGraph import loaderdgraph
+from Mongodb import assignments as mongo_assignments
+from Mongodb import bulkload as mongo_bulkload
+from Mongodb import messages as mongo_messages
+from Mongodb import reports as mongo_reports
+from Mongodb.modelmongo import User, Ticket, AgentAssignment
+
+CLUSTER_IPS = os.getenv('CASSANDRA_CLUSTER_IPS', 'localhost')
+KEYSPACE = os.getenv('CASSANDRA_KEYSPACE', 'final_project')
+DGRAPH_URI = os.getenv('DGRAPH_URI', 'localhost:9080')
+MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017')
+DB_NAME = os.getenv('MONGODB_DB_NAME', 'final_project')
+
+# Model, Mongo collection and per-store row builders of every kind of file
+KINDS = {
+    "users": (User, "users", None, loaderdgraph.imported_user_node),
+    "tickets": (Ticket, "tickets", writer.imported_ticket_rows, None),
+    "assignments": (AgentAssignment, "agent_assignments", writer.imported_assignment_rows, None),
+}
+MAX_PRINTED_ERRORS = 20
+
+
+# READERS: one record at a time, whatever the size of the file. The JSON is
+# decoded by validated() so a broken record is rejected like an invalid one.
+def read_jsonl(path):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield line
+
+
+def read_csv(path):
+    with open(path, newline='') as f:
+        yield from csv.DictReader(f)
+
+
+def csv_decoder(model):
+    # Nested fields (profile, feedback, messages...) are stored as JSON text in their column
+    nested = {name for name, field in model.model_fields.items() if (get_origin(field.annotation) or field.annotation) in (dict, list)}
+
+    def decode(row):
+        for name in nested & row.keys():
+            row[name] = json.loads(row[name]) if row[name] else None
+            if row[name] is None:
+                del row[name]
+        return row
+    return decode
+
+
+def validated(records, decode, model, stats):
+    for line, record in enumerate(records, start=1):
+        try:
+            yield model.model_validate(decode(record)).model_dump(by_alias=True)
+        except (ValidationError, ValueError) as e:
+            stats["rejected"] += 1
+            if stats["rejected"] <= MAX_PRINTED_ERRORS:
+                print(f"Rejected record {line}: {e}", file=sys.stderr)
+
+
+# WRITERS
+def write_cassandra(session, prepared, row_builder, batch, stats):
+    rows = []
+    for document in batch:
+        try:
+            rows.extend(row_builder(document))
+        except ValueError:
+            stats["cassandra_skipped"] += 1  # ids that are not integers do not fit the Cassandra tables
+    writer.write_rows(session, prepared, rows, stats["cassandra"])
+
+
+def import_file(path, kind, file_format, stores, batch_size, mongo_db=None, cassandra_session=None, dgraph_client=None):
+    model, collection, cassandra_rows, dgraph_node = KINDS[kind]
+    if file_format == "jsonl":
+        records, decode = read_jsonl(path), json.loads
+    else:
+        records, decode = read_csv(path), csv_decoder(model)
+    stats = {"rows": 0, "rejected": 0, "cassandra_skipped": 0, "mongo": mongo_bulkload.new_stats(), "cassandra": writer.new_stats()}
+    prepared = writer.prepare_inserts(cassandra_session) if "cassandra" in stores and cassandra_rows else None
+
+    created_days = set()
+    start = time.perf_counter()
+    for batch in datagen.chunked(validated(records, decode, model, stats), batch_size):
+        stats["rows"] += len(batch)
+        if "mongo" in stores:
+            # insert_many adds _id to the documents, the other stores get copies
+            documents = [dict(document) for document in batch]
+            messages = mongo_messages.take_messages(documents) if kind == "tickets" else None
+            inserted = mongo_bulkload.insert_batch(mongo_db[collection], documents, stats["mongo"])
+            if kind == "tickets":
+                # Tickets already imported by an earlier run are skipped along with their messages
+                mongo_messages.insert_buckets(mongo_db, messages, [document["uuid"] for document in inserted])
+                created_days.update(mongo_reports.created_day(document).date() for document in documents)
+            if kind == "assignments":
+                mongo_assignments.set_ticket_assignees(mongo_db, batch)
+        if prepared:
+            write_cassandra(cassandra_session, prepared, cassandra_rows, batch, stats)
+        if "dgraph" in stores:
+            if kind == "users":
+                loaderdgraph.load_user_nodes(dgraph_client, (dgraph_node(document) for document in batch))
+            elif kind == "tickets":
+                loaderdgraph.load_imported_tickets(dgraph_client, batch)
+            else:
+                loaderdgraph.load_imported_assignments(dgraph_client, batch)
+    # Recounted once rather than $inc per batch, so rows already imported are not counted twice
+    if created_days:
+        mongo_reports.build_daily_reports(mongo_db, min(created_days), max(created_days))
+    seconds = time.perf_counter() - start
+
+    print_summary(kind, stats, seconds, stores)
+    return stats
+
+
+def print_summary(kind, stats, seconds, stores):
+    rate = stats["rows"] / seconds if seconds else 0
+    # ru_maxrss is reported in kilobytes on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Imported {stats['rows']} {kind} in {seconds:.2f}s ({rate:.0f} rows/sec), "
+          f"{stats['rejected']} rejected, peak RSS {peak_rss_mb:.1f} MB")
+    if "mongo" in stores:
+        mongo_bulkload.print_stats(f"mongo {kind}", stats["mongo"])
+    if stats["cassandra"]:
+        writer.print_stats(stats["cassandra"], seconds)
+    if stats["cassandra_skipped"]:
+        print(f"{stats['cassandra_skipped']} records skipped in Cassandra (non integer ids)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a CSV/JSONL file of users, tickets or agent assignments into the databases")
+    parser.add_argument("kind", choices=KINDS.keys())
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="file format, guessed from the extension by default")
+    parser.add_argument("--batch-size", type=int, default=mongo_bulkload.DEFAULT_BATCH_SIZE)
+    parser.add_argument("--stores", default="mongo,cassandra,dgraph", help="comma separated list of stores to write")
+    args = parser.parse_args()
+
+    file_format = args.format or ("csv" if args.path.endswith(".csv") else "jsonl")
+    stores = set(args.stores.split(","))
+
+    mongodb_client = MongoClient(MONGODB_URI) if "mongo" in stores else None
+    cassandra_cluster = Cluster(CLUSTER_IPS.split(',')) if "cassandra" in stores else None
+    cassandra_session = cassandra_cluster.connect(KEYSPACE) if cassandra_cluster else None
+    dgraph_client_stub = pydgraph.DgraphClientStub(DGRAPH_URI) if "dgraph" in stores else None
+    dgraph_client = pydgraph.DgraphClient(dgraph_client_stub) if dgraph_client_stub else None
+    try:
+        import_file(args.path, args.kind, file_format, stores, args.batch_size,
+                    mongo_db=mongodb_client[DB_NAME] if mongodb_client else None,
+                    cassandra_session=cassandra_session, dgraph_client=dgraph_client)
+    finally:
+        if cassandra_cluster:
+            cassandra_cluster.shutdown()
+        if mongodb_client:
+            mongodb_client.close()
+        if dgraph_client_stub:
+            dgraph_client_stub.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+import json
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import datagen
+from Cassandra import writer
+from DGraph import loaderdgraph
+from Mongodb import bulkload as mongo_bulkload
+from Mongodb import indexes as mongo_indexes
+from Mongodb import reports
+
+DEFAULT_CHUNK_SIZE = 10000  # tickets per checkpointed chunk
+DEFAULT_QUEUE_SIZE = 4      # chunks buffered per store before the generator waits
+CHECKPOINT_PATH = os.getenv('BULK_LOAD_CHECKPOINT', 'bulk_load_checkpoint.json')
+STORES = ["mongo", "cassandra", "dgraph"]
+
+
+# CHECKPOINT FILE
+def load_checkpoint(path, params):
+    """
+    Return the saved progress for a job with the same parameters, or a fresh one.
+    A checkpoint left by a different job is never reused silently.
+    """
+    if not os.path.exists(path):
+        return {"params": params, "stages": {}, "chunks": {store: [] for store in STORES}}
+
+    with open(path) as f:
+        checkpoint = json.load(f)
+    saved = dict(checkpoint["params"])
+    # Resolved by the first run, a resume must reuse them to regenerate the same stream
+    for key in ("seed", "start_date"):
+        if params.get(key) is None:
+            params[key] = saved.get(key)
+    if saved != params:
+        raise ValueError(f"Checkpoint {path} belongs to another load {saved}, delete it to start a new one")
+    return checkpoint
+
+
+def save_checkpoint(path, checkpoint):
+    # Write to a temporary file first so a crash never leaves a half written checkpoint
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def mark_chunk_done(path, checkpoint, store, chunk_index):
+    checkpoint["chunks"][store].append(chunk_index)
+    save_checkpoint(path, checkpoint)
+
+
+def mark_stage_done(path, checkpoint, stage):
+    checkpoint["stages"][stage] = True
+    save_checkpoint(path, checkpoint)
+
+
+# STORE WRITERS, every one of them is idempotent so a chunk can be replayed
+def check_mongo(stats):
+    failed = sum(collection_stats["failed"] for collection_stats in stats.values())
+    if failed:
+        raise RuntimeError(f"{failed} Mongo documents could not be written")
+
+
+def check_cassandra(stats, failed_before):
+    failed = writer.failed_rows(stats) - failed_before
+    if failed:
+        raise RuntimeError(f"{failed} Cassandra rows could not be written")
+
+
+def check_dgraph(stats, failed_before):
+    if stats["failed_chunks"] > failed_before:
+        raise RuntimeError(f"Dgraph mutation failed: {stats['last_error']}")
+
+
+def run(session, dgraph_client, mongo_client, ticket_count=10, agent_count=2, customer_count=2, days=1, seed=None,
+        start_date=None, chunk_size=DEFAULT_CHUNK_SIZE, queue_size=DEFAULT_QUEUE_SIZE, checkpoint_path=CHECKPOINT_PATH):
+    """
+    Load generated data into Mongo, Cassandra and Dgraph in checkpointed chunks.
+
+    The three stores are written concurrently from a single generated stream, so
+    the total time approaches the one of the slowest store. After each store
+    finishes a chunk it is recorded in `checkpoint_path`; a rerun with the same
+    parameters regenerates the same stream and skips those chunks. The
+    checkpoint file is removed once the whole load is done. The seed and the
+    first day (default: `days` ending today) are picked once and kept in the
+    checkpoint, so a resume on another day still generates the same tickets.
+    """
+    params = {"ticket_count": ticket_count, "agent_count": agent_count, "customer_count": customer_count,
+              "days": days, "seed": seed, "start_date": start_date.isoformat() if start_date else None,
+              "chunk_size": chunk_size}
+    checkpoint = load_checkpoint(checkpoint_path, params)
+    if checkpoint["params"]["seed"] is None:
+        checkpoint["params"]["seed"] = random.randrange(2 ** 32)
+    if checkpoint["params"]["start_date"] is None:
+        checkpoint["params"]["start_date"] = (date.today() - timedelta(days=days - 1)).isoformat()
+    seed = checkpoint["params"]["seed"]
+    start_date = date.fromisoformat(checkpoint["params"]["start_date"])
+    save_checkpoint(checkpoint_path, checkpoint)
+    done = {store: set(chunks) for store, chunks in checkpoint["chunks"].items()}
+    if any(done.values()):
+        print(f"Resuming load from {checkpoint_path}: " + ", ".join(f"{store} {len(done[store])} chunks" for store in STORES))
+
+    db = mongo_client["final_project"]
+    start = time.perf_counter()
+
+    # Users and indexes (cheap and idempotent, but skipped once recorded)
+    if not checkpoint["stages"].get("mongo_users"):
+        mongo_indexes.ensure_indexes(db)
+        check_mongo({"users": mongo_bulkload.load_users(db, datagen.generate_users(agent_count, customer_count))})
+        mark_stage_done(checkpoint_path, checkpoint, "mongo_users")
+    uid_map = loaderdgraph.load_users(dgraph_client, agent_count, customer_count)
+
+    prepared = writer.prepare_inserts(session)
+    mongo_stats = {"tickets": mongo_bulkload.new_stats(), "agent_assignments": mongo_bulkload.new_stats()}
+    cassandra_stats = writer.new_stats()
+    dgraph_stats = {"tickets": 0, "failed_chunks": 0, "last_error": None, "seconds": 0.0}
+    busy = {store: 0.0 for store in STORES}
+
+    def write_mongo(chunk):
+        mongo_bulkload.load_ticket_chunk(db, chunk, mongo_stats)
+        check_mongo(mongo_stats)
+
+    def write_cassandra(chunk):
+        failed_before = writer.failed_rows(cassandra_stats)
+        writer.write_ticket_chunk(session, prepared, chunk, cassandra_stats)
+        check_cassandra(cassandra_stats, failed_before)
+
+    def write_dgraph(chunk):
+        failed_before = dgraph_stats["failed_chunks"]
+        chunk_stats = loaderdgraph.load_tickets(dgraph_client, chunk, uid_map)
+        for key in ("tickets", "failed_chunks", "seconds"):
+            dgraph_stats[key] += chunk_stats[key]
+        dgraph_stats["last_error"] = chunk_stats["last_error"] or dgraph_stats["last_error"]
+        check_dgraph(dgraph_stats, failed_before)
+
+    sinks = {"mongo": write_mongo, "cassandra": write_cassandra, "dgraph": write_dgraph}
+    queues = {store: queue.Queue(maxsize=queue_size) for store in STORES}
+    checkpoint_lock = threading.Lock()
+    stop = threading.Event()
+    errors = []
+
+    def sink_worker(store):
+        while True:
+            item = queues[store].get()
+            if item is None:
+                return
+            if stop.is_set():
+                continue  # keep draining so the generator is never blocked on a dead sink
+            chunk_index, chunk = item
+            sink_start = time.perf_counter()
+            try:
+                sinks[store](chunk)
+            except Exception as e:
+                errors.append((store, chunk_index, e))
+                stop.set()
+                continue
+            busy[store] += time.perf_counter() - sink_start
+            with checkpoint_lock:
+                mark_chunk_done(checkpoint_path, checkpoint, store, chunk_index)
+
+    # One generated stream fanned out to a worker per store; the bounded queues
+    # make the generator wait whenever the slowest store falls behind
+    with ThreadPoolExecutor(max_workers=len(STORES)) as executor:
+        workers = [executor.submit(sink_worker, store) for store in STORES]
+        tickets = datagen.generate_tickets(ticket_count, agent_count, customer_count, days=days, seed=seed,
+                                           start_date=start_date)
+        try:
+            for chunk_index, chunk in enumerate(datagen.chunked(tickets, chunk_size)):
+                if stop.is_set():
+                    break
+                for store in STORES:
+                    if chunk_index not in done[store]:
+                        queues[store].put((chunk_index, chunk))
+        finally:
+            for store in STORES:
+                queues[store].put(None)
+        for worker in workers:
+            worker.result()
+
+    if errors:
+        store, chunk_index, error = errors[0]
+        raise RuntimeError(f"{store} failed on chunk {chunk_index}, rerun to resume: {error}") from error
+
+    if not checkpoint["stages"].get("daily_report"):
+        # One server-side aggregation for every generated day
+        reports.build_daily_reports(db, start_date, start_date + timedelta(days=days - 1))
+        mark_stage_done(checkpoint_path, checkpoint, "daily_report")
+
+    mongo_bulkload.print_stats("tickets", mongo_stats["tickets"])
+    mongo_bulkload.print_stats("agent_assignments", mongo_stats["agent_assignments"])
+    writer.print_stats(cassandra_stats, busy["cassandra"])
+    loaderdgraph.print_stats(dgraph_stats)
+    print("Time spent writing per store: " + ", ".join(f"{store} {busy[store]:.2f}s" for store in STORES))
+
+    os.remove(checkpoint_path)
+    print(f"Bulk load complete in {time.perf_counter() - start:.2f}s (seed {seed}, from {start_date})")
@@ -3,6 +3,7 @@ import os
 from cassandra.cluster import Cluster
 from pymongo import MongoClient
 import pydgraph
+from anyio import to_thread
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 
@@ -10,6 +11,7 @@ from Cassandra import model
 from DGraph import modeldgraph
 from Mongodb.routes import router as db_router
 from Mongodb import client as mdb_functions
+from Mongodb import indexes as mdb_indexes
 
 # Main Configuration
 CLUSTER_IPS = os.getenv('CASSANDRA_CLUSTER_IPS', 'localhost')
@@ -19,6 +21,7 @@ REPLICATION_FACTOR = os.getenv('CASSANDRA_REPLICATION_FACTOR', '1')
 DGRAPH_URI = os.getenv('DGRAPH_URI', 'localhost:9080')
 MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017')
 DB_NAME = os.getenv('MONGODB_DB_NAME', 'final_project')
+API_THREADPOOL_SIZE = int(os.getenv('API_THREADPOOL_SIZE', '100'))
 
 dgraph_client_stub = pydgraph.DgraphClientStub(DGRAPH_URI)
 dgraph_client = pydgraph.DgraphClient(dgraph_client_stub)
@@ -34,6 +37,8 @@ mongodb_database = mongodb_client[DB_NAME]
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Sync routes run in anyio's thread pool (40 threads by default)
+    to_thread.current_default_thread_limiter().total_tokens = API_THREADPOOL_SIZE
     print("Initializing databases...")
 
     # MongoDB
@@ -42,6 +47,7 @@ async def lifespan(app: FastAPI):
     app.state.mongodb_client = mongodb_client
     app.state.mongodb_database = mongodb_database
     print(f"Connected to MongoDB at: {MONGODB_URI}, Database: {DB_NAME}")
+    mdb_indexes.ensure_indexes(mongodb_database)
 
     # Cassandra
     cassandra_cluster = Cluster(CLUSTER_IPS.split(','))
@@ -113,7 +119,8 @@ def print_admin_menu():
         12: "Update tickets resolution steps",
         13: "Delete ticket",
         14: "See tickets by CustomerID",
-        15: "Logout"
+        15: "Bulk update Status and/or Priority",
+        16: "Logout"
     }
 
     # Determine the total number of menu items
@@ -293,6 +300,8 @@ def menu_handler():
                     elif choice_2 == 14:
                         mdb_functions.fetch_tickets_by_customer()
                     elif choice_2 == 15:
+                        mdb_functions.bulk_update_tickets()
+                    elif choice_2 == 16:
                         print("Logging out...")
                         break
 
@@ -302,10 +311,15 @@ def menu_handler():
 
         if choice == 1:  # Insert bulk data
             print("Inserting bulk data into MongoDB, Cassandra, and Dgraph...")
-            #insert dgraph 
-            #modeldgraph.create_data(dgraph_client)
-            #insert Cassandra
-            model.bulk_insert(cassandra_session, dgraph_client, mongodb_client)
+            ticket_count = int(input("Number of tickets [10]: ") or 10)
+            agent_count = int(input("Number of agents [2]: ") or 2)
+            customer_count = int(input("Number of customers [2]: ") or 2)
+            days = int(input("Days of history [1]: ") or 1)
+            seed = input("Random seed (blank for random): ").strip()
+            seed = int(seed) if seed else None
+            model.bulk_insert(cassandra_session, dgraph_client, mongodb_client,
+                              ticket_count=ticket_count, agent_count=agent_count,
+                              customer_count=customer_count, days=days, seed=seed)
             print("Data inserted successfully.")
         
         if choice not in range(1, 9):